@@ -1,6 +1,7 @@
-from collections import defaultdict
 from typing import Optional, Union
 
+import numpy
+
 from cogent3.core.alignment import SequenceCollection
 from cogent3.core.genetic_code import GeneticCode, get_code
 from cogent3.core.moltype import Alphabet, MolType, get_moltype
@@ -46,17 +47,17 @@ def best_frame(
         or the the stop codon is not at the sequence end
     """
     gc = get_code(gc)
-    translations = gc.sixframes(seq)
-    if not allow_rc:
-        translations = translations[:3]
+    if 0 < len(seq) < 3:
+        raise ValueError("Translation starts after end of RNA")
+
+    frames = gc._frame_stops(seq, rc=allow_rc)
 
     if not require_stop:
         # don't count stops if they're at the end of the aa sequence
-        for i in range(len(translations)):
-            if translations[i].endswith("*"):
-                translations[i] = translations[i][:-1]
+        frames = [fr[:-1] if len(fr) and fr[-1] else fr for fr in frames]
 
-    stops_in_frame = [(tr.count("*"), i) for i, tr in enumerate(translations)]
+    ends_with_stop = [bool(len(fr) and fr[-1]) for fr in frames]
+    stops_in_frame = [(int(fr.sum()), i) for i, fr in enumerate(frames)]
     stops_in_frame.sort()
     min_stops, frame = stops_in_frame[0]
     # if min_stops > 1, cannot be translated
@@ -73,7 +74,7 @@ def best_frame(
     if not 0 <= min_stops <= 1:
         raise ValueError(f"{seq.name!r} cannot be robustly translated")
 
-    if min_stops == 1 and not translations[frame].endswith("*"):
+    if min_stops == 1 and not ends_with_stop[frame]:
         raise ValueError(f"{seq.name!r} cannot be robustly translated")
     frame += 1
     if allow_rc and frame > 3:
@@ -108,9 +109,11 @@ def translate_frames(
         moltype = get_moltype(moltype)
         seq = moltype.make_seq(seq)
 
-    translations = gc.sixframes(seq)
-    if not allow_rc:
-        translations = translations[:3]
+    data = str(seq)
+    translations = [gc.translate(data, start) for start in range(3)]
+    if allow_rc:
+        data = seq.moltype.rc(data)
+        translations.extend(gc.translate(data, start) for start in range(3))
 
     return translations
 
@@ -129,29 +132,23 @@ def get_fourfold_degenerate_sets(
     as_indices
         codons are represented as indices, rather than strings
     """
-    four_fold = set()
-    syns = gc.synonyms
-    for codons in list(syns.values()):
-        if len(codons) < 4:
-            continue
-        pos12s = defaultdict(list)
-        for codon in codons:
-            pos12s[codon[:2]].append(codon)
-
-        for groups in list(pos12s.values()):
-            if len(groups) == 4:
-                four_fold.update([frozenset(groups)])
-
-    if as_indices:
-        assert alphabet is not None, "Must provide alphabet to convert to indices"
-        ffold = set()
-        to_indices = alphabet.to_indices
-        for group in four_fold:
-            grp = frozenset(tuple(to_indices(element)) for element in group)
-            ffold.add(grp)
-        four_fold = ffold
-
-    return four_fold
+    gc = get_code(gc)
+    # codons are in TCAG order, so each row of 4 shares the first two bases
+    # and is 4-fold degenerate if all encode the same amino acid
+    aas = numpy.frombuffer(gc.code_sequence.encode("ascii"), dtype=numpy.uint8)
+    aas = aas.reshape(16, 4)
+    rows = numpy.flatnonzero((aas == aas[:, :1]).all(axis=1))
+    quartets = rows[:, None] * 4 + numpy.arange(4)
+
+    if not as_indices:
+        codons = gc._codons
+        return {frozenset(codons[i] for i in group) for group in quartets.tolist()}
+
+    assert alphabet is not None, "Must provide alphabet to convert to indices"
+    nt_indices = numpy.array(alphabet.to_indices("TCAG"))
+    positions = numpy.stack([quartets >> 4, (quartets >> 2) & 3, quartets & 3], axis=-1)
+    codons = nt_indices[positions]
+    return {frozenset(map(tuple, group)) for group in codons.tolist()}
 
 
 @define_app
@@ -270,10 +267,11 @@ class select_translatable:
                     frame *= -1
                 frame -= 1  # returned from best frame as 1, 2, 3
                 num_codons = (len(seq) - frame) // 3
-                seq = seq[frame : frame + (num_codons * 3)]
-                if self._trim_terminal_stop:
-                    seq = seq.trim_stop_codon(gc=self._gc)
-                translatable.append([seq.name, seq])
+                # slicing the string avoids creating intermediate sequences
+                data = str(seq)[frame : frame + (num_codons * 3)]
+                if self._trim_terminal_stop and self._gc.is_stop(data[-3:]):
+                    data = data[:-3]
+                translatable.append([seq.name, data])
             except ValueError as msg:
                 # TODO handle case where incomplete at end OR beginning
                 # plus case where is divisible by 3 but not in frame
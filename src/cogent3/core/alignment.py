@@ -4554,6 +4554,57 @@ class ArrayAlignment(AlignmentI, _SequenceCollectionBase):
 
         return gapped
 
+    @extend_docstring_from(_SequenceCollectionBase.get_translation)
+    def get_translation(
+        self, gc=None, incomplete_ok=False, include_stop=False, trim_stop=True, **kwargs
+    ):
+        if len(self.moltype.alphabet) != 4:
+            raise TypeError("Must be a DNA/RNA")
+
+        if not trim_stop or include_stop:
+            seqs = self
+        else:
+            seqs = self.trim_stop_codons(gc=gc, strict=not incomplete_ok)
+
+        gc = get_code(gc)
+        gap = seqs.alphabet.index(seqs.moltype.gap)
+        data = seqs.array_seqs
+        num_codons = data.shape[1] // 3
+        codons = data[:, : num_codons * 3].reshape(len(data), num_codons, 3)
+        # translate all codons at once, using the base 5 codon indices of the
+        # genetic code translation table, characters not in the genetic code
+        # bases have index 4
+        nt_indices = [gc._nt.find(char) % 5 for char in seqs.alphabet]
+        nts = array(nt_indices, dtype=uint8)[codons]
+        aas = gc._translation_table[nts[..., 0] * 25 + nts[..., 1] * 5 + nts[..., 2]]
+        gapped = (codons == gap).all(axis=-1)
+        aas[gapped] = ord("-")
+        # sequences with ambiguous or incomplete codons are translated
+        # individually, as are those where the terminal stop check of the
+        # sequence translation applies, i.e. with a stop, trailing bases
+        # or no bases
+        translated = ((nts < 4).all(axis=-1) | gapped).all(axis=-1)
+        if not include_stop:
+            translated &= (aas != ord("*")).all(axis=-1)
+            translated &= (data[:, num_codons * 3 :] == gap).all(axis=-1)
+            translated &= ~gapped.all(axis=-1)
+
+        moltype = cogent3.get_moltype(
+            "protein_with_stop" if include_stop else "protein"
+        )
+        translations = []
+        for i, seqname in enumerate(seqs.names):
+            if translated[i]:
+                pep = aas[i].tobytes().decode("ascii")
+            else:
+                seq = seqs.get_gapped_seq(seqname)
+                pep = seq.get_translation(
+                    gc, incomplete_ok=incomplete_ok, include_stop=include_stop
+                )
+            translations.append((seqname, pep))
+        kwargs["moltype"] = moltype
+        return self.__class__(translations, info=self.info, **kwargs)
+
 
 def make_gap_filter(template, gap_fraction, gap_run):
     """Returns f(seq) -> True if no gap runs and acceptable gap fraction.
@@ -10,6 +10,8 @@ import os
 import re
 from itertools import product
 
+import numpy
+
 from cogent3.util.table import Table
 
 maketrans = str.maketrans
@@ -37,6 +39,54 @@ def _simple_rc(seq):
 
 _bases = "TCAG"
 
+# maps the bytes of nucleotide characters to their index in _bases, U is
+# treated as T and all other characters map to 4
+_nt_indices = numpy.full(256, 4, dtype=numpy.uint8)
+for _i, _nt in enumerate(_bases):
+    _nt_indices[[ord(_nt), ord(_nt.lower())]] = _i
+_nt_indices[[ord("U"), ord("u")]] = 0
+
+
+# for bytes.translate()
+_nt_indices_bytes = _nt_indices.tobytes()
+
+# below this number of codons, translation using bytes methods is faster
+# than with numpy
+_MIN_ARRAY_CODONS = 50
+
+
+def _to_nt_indices(dna):
+    """returns uint8 array of the _nt_indices values of the characters in dna"""
+    # non-ascii characters are replaced one-for-one, so map to 4
+    dna = str(dna).encode("ascii", "replace")
+    return _nt_indices[numpy.frombuffer(dna, dtype=numpy.uint8)]
+
+
+def _make_translation_table(code_sequence):
+    """returns uint8 array of amino acid bytes for the base 5 codon indices
+
+    A codon with _nt_indices values (a, b, c) has index a * 25 + b * 5 + c,
+    codons containing a character not in _bases translate to 'X'.
+    """
+    table = numpy.full(125, ord("X"), dtype=numpy.uint8)
+    indices = numpy.arange(64)
+    table[(indices >> 4) * 25 + ((indices >> 2) & 3) * 5 + (indices & 3)] = (
+        numpy.frombuffer(code_sequence.encode("ascii"), dtype=numpy.uint8)
+    )
+    return table
+
+
+def _make_rc_codon_indices():
+    """returns array mapping base 5 codon indices to that of the reverse
+    complement codon"""
+    complement = numpy.array([2, 3, 0, 1, 4])
+    indices = numpy.arange(125)
+    first, second, third = complement[[indices // 25, indices // 5 % 5, indices % 5]]
+    return third * 25 + second * 5 + first
+
+
+_rc_codon_indices = _make_rc_codon_indices()
+
 
 class GeneticCode:
     """Holds codon to amino acid mapping, and vice versa.
@@ -88,6 +138,11 @@ class GeneticCode:
             )
 
         self.code_sequence = code_sequence
+        self._translation_table = _make_translation_table(code_sequence)
+        # for bytes.translate(), which requires a 256 byte table
+        self._translation_bytes = self._translation_table.tobytes().ljust(256, b"X")
+        self._stop_table = self._translation_table == ord("*")
+        self._rc_stop_table = self._stop_table[_rc_codon_indices]
         self.ID = ID
         self.name = name
         self.start_codon_sequence = start_codon_sequence
@@ -267,7 +322,43 @@ class GeneticCode:
             return ""
         if start + 1 > len(dna):
             raise ValueError("Translation starts after end of RNA")
-        return "".join([self[dna[i : i + 3]] for i in range(start, len(dna) - 2, 3)])
+        num_codons = (len(dna) - start) // 3
+        if num_codons < _MIN_ARRAY_CODONS:
+            nts = str(dna).encode("ascii", "replace").translate(_nt_indices_bytes)
+            codons = bytes(
+                [
+                    nts[i] * 25 + nts[i + 1] * 5 + nts[i + 2]
+                    for i in range(start, start + 3 * num_codons, 3)
+                ]
+            )
+            return codons.translate(self._translation_bytes).decode("ascii")
+
+        nts = _to_nt_indices(dna)[start : start + 3 * num_codons]
+        nts = nts.reshape(num_codons, 3)
+        # base 5 so a codon with any invalid character has its own index
+        codons = nts[:, 0] * 25 + nts[:, 1] * 5 + nts[:, 2]
+        return self._translation_table[codons].tobytes().decode("ascii")
+
+    def _frame_stops(self, dna, rc=False):
+        """returns boolean arrays flagging the stop codons in frames 0, 1 and 2
+
+        Parameters
+        ----------
+        dna
+            a string of nucleotides
+        rc
+            the frames of the reverse complement of dna follow
+        """
+        nts = _to_nt_indices(dna)
+        # the codon starting at every position, so frames are strided views
+        codons = nts[:-2] * 25 + nts[1:-1] * 5 + nts[2:]
+        is_stop = self._stop_table[codons]
+        frames = [is_stop[start::3] for start in range(3)]
+        if rc:
+            # reversed, these are the codons of the reverse complement
+            is_stop = self._rc_stop_table[codons][::-1]
+            frames.extend(is_stop[start::3] for start in range(3))
+        return frames
 
     def get_stop_indices(self, dna, start=0):
         """returns indexes for stop codons in the specified frame"""
@@ -1,4 +1,4 @@
-import copy
+import base64
 import dataclasses
 import functools
 import inspect
@@ -6,15 +6,20 @@ import json
 from abc import ABC, abstractmethod
 from bisect import bisect_left, bisect_right
 from functools import total_ordering
-from itertools import chain
+from itertools import chain, compress
 from typing import Any, Iterator, Optional, Sequence, Union
 
 import numpy
 from numpy.typing import NDArray
 
 from cogent3._version import __version__
+from cogent3.core import location_numba
 from cogent3.util import warning as c3warn
-from cogent3.util.deserialise import register_deserialiser
+from cogent3.util.deserialise import (
+    _get_class,
+    deserialise_map_spans,
+    register_deserialiser,
+)
 from cogent3.util.misc import (
     ClassChecker,
     ConstrainedList,
@@ -26,20 +31,89 @@ from cogent3.util.misc import (
 strip = str.strip
 
 _DEFAULT_GAP_DTYPE = numpy.int32
+_MAX_DEFAULT_GAP_VALUE = numpy.iinfo(_DEFAULT_GAP_DTYPE).max
+# number of gaps from which IndelMap index conversion uses an Eytzinger
+# ordered search instead of numpy.searchsorted
+_EYTZINGER_THRESHOLD = 1024
+_EMPTY_ORDER = numpy.empty(0, dtype=numpy.int64)
+
+
+@functools.cache
+def _class_provenance(cls: type) -> str:
+    """cached get_object_provenance() for classes"""
+    return get_object_provenance(cls)
 
 
 def _norm_index(i, length, default):
     """For converting s[:3] to s[0:3], s[-1] to s[len(s)-1] and s[0:lots] to s[0:len(s)]"""
     if i is None:
         i = default
+    elif isinstance(i, numpy.ndarray):
+        return _norm_index_array(i, length, default)
     elif i < 0:
         i += length
     return min(max(i, 0), length)
 
 
+def _norm_index_array(indices: numpy.ndarray, length: int, default: int):
+    """vectorised form of _norm_index, None elements are set to default"""
+    if indices.dtype == object:
+        indices = numpy.where(numpy.equal(indices, None), default, indices)
+        indices = indices.astype(numpy.int64)
+    indices = numpy.where(indices < 0, indices + length, indices)
+    return indices.clip(0, length)
+
+
+def _bisect_right_from_hint(values: Sequence[int], x: int, hint: int) -> int:
+    """equivalent to bisect_right(values, x), but searches outwards from hint
+
+    Notes
+    -----
+    Uses an exponential search, which is O(log d) where d is the distance
+    between hint and the result.
+    """
+    num = len(values)
+    if not 0 <= hint < num:
+        return bisect_right(values, x)
+
+    step = 1
+    if values[hint] <= x:
+        lo, hi = hint, hint + 1
+        while hi < num and values[hi] <= x:
+            lo = hi
+            step *= 2
+            hi = lo + step
+        return bisect_right(values, x, lo, min(hi, num))
+
+    lo, hi = hint - 1, hint
+    while lo >= 0 and values[lo] > x:
+        hi = lo
+        step *= 2
+        lo = hi - step
+    return bisect_right(values, x, max(lo, 0), hi)
+
+
+_slice_type = slice
+
+
 def as_map(slice, length, cls):
     """Take anything that might be used as a subscript: Integer, Slice,
     or MapABC, and return cls."""
+    # IndelMap has this class method
+    from_locations = getattr(cls, "from_locations", cls)
+    # fast paths for the most common subscripts
+    if isinstance(slice, int):
+        lo = slice + length if slice < 0 else slice
+        if lo >= length:
+            raise IndexError(slice)
+        return from_locations(locations=[(lo, lo + 1)], parent_length=length)
+    elif (
+        isinstance(slice, _slice_type)
+        and slice.start is None
+        and slice.stop is None
+        and slice.step in (None, 1)
+    ):
+        return from_locations(locations=[(0, length)], parent_length=length)
 
     if isinstance(slice, (list, tuple)):
         spans = []
@@ -49,13 +123,11 @@ def as_map(slice, length, cls):
     elif isinstance(slice, (FeatureMap, IndelMap, Map)):
         return slice
     else:
-        lo, hi, step = _norm_slice(slice, length)
+        lo, hi, step = _norm_slice_fast(slice, length)
         assert (step or 1) == 1
         # since we disallow step, a reverse slice means an empty series
         locations = [] if lo > hi else [(lo, hi)]
-        # IndelMap has this class method
-        cls = getattr(cls, "from_locations", cls)
-        return cls(locations=locations, parent_length=length)
+        return from_locations(locations=locations, parent_length=length)
 
 
 class SpanI(object):
@@ -174,7 +246,7 @@ class Span(SpanI):
         "start",
         "end",
         "reverse",
-        "_serialisable",
+        "_key",
     )
 
     def __init__(
@@ -186,10 +258,6 @@ class Span(SpanI):
         value=None,
         reverse=False,
     ):
-        d = locals()
-        x = ("self", "__class__", "__slots__")
-        self._serialisable = {k: v for k, v in d.items() if k not in x}
-
         self._new_init(start, end, reverse)
         self.tidy_start = tidy_start
         self.tidy_end = tidy_end
@@ -220,12 +288,24 @@ class Span(SpanI):
             self.start = start
             self.end = end
             self.reverse = reverse
+        self._update_key()
+
+    def _update_key(self):
+        """caches the sort key, call after modifying start, end or reverse"""
+        self._key = (self.start, self.end, self.reverse)
 
     def to_rich_dict(self):
-        attribs = copy.deepcopy(self._serialisable)
-        attribs["type"] = get_object_provenance(self)
-        attribs["version"] = __version__
-        return attribs
+        # constructed from the attributes, saves storing a dict per instance
+        return {
+            "start": self.start,
+            "end": self.end,
+            "tidy_start": self.tidy_start,
+            "tidy_end": self.tidy_end,
+            "value": self.value,
+            "reverse": self.reverse,
+            "type": _class_provenance(type(self)),
+            "version": __version__,
+        }
 
     def __setstate__(self, args):
         self.__init__(*args)
@@ -257,7 +337,7 @@ class Span(SpanI):
         )
 
     def __getitem__(self, slice):
-        start, end, step = _norm_slice(slice, self.length)
+        start, end, step = _norm_slice_fast(slice, self.length)
         assert (step or 1) == 1, slice
         assert start <= end, slice
         tidy_start = self.tidy_start and start == 0
@@ -303,8 +383,16 @@ class Span(SpanI):
         zlo, zhi = max(0, self.start), min(map_length, self.end)
 
         # Find the right span(s) of the map
-        first = bisect_right(offsets, zlo) - 1
-        last = bisect_left(offsets, zhi, first) - 1
+        offsets_arr = getattr(map, "_offsets_arr", None)
+        if offsets_arr is None:
+            first = bisect_right(offsets, zlo) - 1
+            last = bisect_left(offsets, zhi, first) - 1
+        else:
+            # successive remaps onto the same map are typically to nearby
+            # positions, so we search outwards from the previous result
+            first = _bisect_right_from_hint(offsets, zlo, map._remap_hint) - 1
+            map._remap_hint = max(first, 0)
+            last = max(first, int(offsets_arr.searchsorted(zhi, side="left"))) - 1
         result = spans[first : last + 1]
 
         # Cut off something at either end to get
@@ -332,18 +420,31 @@ class Span(SpanI):
             if self.tidy_end:
                 result[-1].tidy_end = True
 
-        # Deal with case where self is a reverse slice.
+        # Deal with case where self is a reverse slice, and assign our value,
+        # in a single pass
+        value = self.value
         if self.reverse:
-            result = [part.reversed() for part in result]
-            result.reverse()
-
-        if self.value is not None:
-            result = [copy.copy(s) for s in result]
-            for s in result:
-                s.value = self.value
+            result = [
+                part.reversed()
+                if value is None
+                else part.reversed()._clone_with_value(value)
+                for part in reversed(result)
+            ]
+        elif value is not None:
+            result = [part._clone_with_value(value) for part in result]
 
         return result
 
+    def _clone_with_value(self, value):
+        """returns a copy of self with value, bypassing __init__"""
+        new = object.__new__(type(self))
+        new.start, new.end, new.reverse = self.start, self.end, self.reverse
+        new.tidy_start, new.tidy_end = self.tidy_start, self.tidy_end
+        new.length = self.length
+        new.value = value
+        new._key = self._key
+        return new
+
     def __contains__(self, other):
         """Returns True if other completely contained in self.
 
@@ -368,6 +469,7 @@ class Span(SpanI):
     def reverses(self):
         """Reverses self."""
         self.reverse = not self.reverse
+        self._update_key()
 
     def reversed_relative_to(self, length):
         """Returns a new span with positions adjusted relative to length. For
@@ -392,6 +494,13 @@ class Span(SpanI):
         else:
             return iter(range(self.start, self.end, 1))
 
+    def as_array(self) -> numpy.ndarray:
+        """returns the indices contained in self, in iteration order, as an
+        int64 numpy array"""
+        if self.reverse:
+            return numpy.arange(self.end - 1, self.start - 1, -1, dtype=numpy.int64)
+        return numpy.arange(self.start, self.end, dtype=numpy.int64)
+
     def __str__(self):
         """Returns string representation of self."""
         return f"({self.start},{self.end},{bool(self.reverse)})"
@@ -402,7 +511,10 @@ class Span(SpanI):
 
     def __lt__(self, other):
         """Compares indices of self with indices of other."""
-        if hasattr(other, "start") and hasattr(other, "end"):
+        # isinstance is the common case and avoids the hasattr lookups
+        if isinstance(other, Span):
+            return self._key < other._key
+        elif hasattr(other, "start") and hasattr(other, "end"):
             s = (self.start, self.end, self.reverse)
             o = (other.start, other.end, other.reverse)
             return s < o
@@ -411,7 +523,9 @@ class Span(SpanI):
 
     def __eq__(self, other):
         """Compares indices of self with indices of other."""
-        if hasattr(other, "start") and hasattr(other, "end"):
+        if isinstance(other, Span):
+            return self._key == other._key
+        elif hasattr(other, "start") and hasattr(other, "end"):
             return (
                 self.start == other.start
                 and self.end == other.end
@@ -424,23 +538,21 @@ class Span(SpanI):
 class _LostSpan:
     """A placeholder span which doesn't exist in the underlying sequence"""
 
-    __slots__ = ["length", "value", "_serialisable"]
+    __slots__ = ["length", "value"]
     lost = True
     terminal = False
 
     def __init__(self, length, value=None):
-        d = locals()
-        exclude = ("self", "__class__", "__slots__")
-        self._serialisable = {k: v for k, v in d.items() if k not in exclude}
-
         self.length = length
         self.value = value
 
     def to_rich_dict(self):
-        attribs = copy.deepcopy(self._serialisable)
-        attribs["type"] = get_object_provenance(self)
-        attribs["version"] = __version__
-        return attribs
+        return {
+            "length": self.length,
+            "value": self.value,
+            "type": _class_provenance(type(self)),
+            "version": __version__,
+        }
 
     def __len__(self):
         return self.length
@@ -461,8 +573,11 @@ class _LostSpan:
         return self
 
     def __getitem__(self, slice):
-        (start, end, step) = _norm_slice(slice, self.length)
+        (start, end, step) = _norm_slice_fast(slice, self.length)
         assert (step or 1) == 1, slice
+        if type(self) is _LostSpan:
+            # reuse cached instances, subclasses are not cached
+            return LostSpan(abs(end - start), self.value)
         return self.__class__(abs(end - start), self.value)
 
     def __mul__(self, scale):
@@ -475,22 +590,26 @@ class _LostSpan:
     def remap_with(self, map):
         return [self]
 
+    def _clone_with_value(self, value):
+        """returns a copy of self with value"""
+        return self.__class__(self.length, value)
+
     def reversed_relative_to(self, length):
         return self
 
 
-# Save memory by only making one of each small gap
-_lost_span_cache = {}
+# Save memory by only making one of each small gap, the cache is bounded
+# and thread safe
+@functools.lru_cache(maxsize=4096)
+def _cached_lost_span(length):
+    return _LostSpan(length)
 
 
 def LostSpan(length, value=None):
-    global _lost_span_cache
     if value is None and length < 1000:
-        if length not in _lost_span_cache:
-            _lost_span_cache[length] = _LostSpan(length, value)
-        return _lost_span_cache[length]
-    else:
-        return _LostSpan(length, value)
+        # int() so numpy integers share the cache key of the equivalent int
+        return _cached_lost_span(int(length))
+    return _LostSpan(length, value)
 
 
 class TerminalPadding(_LostSpan):
@@ -507,6 +626,157 @@ SeqSpanTypes = Sequence[SpanTypes]
 SeqCoordTypes = Sequence[Sequence[IntTypes]]
 
 
+def _spans_to_arrays(
+    spans: SeqSpanTypes,
+) -> tuple[IntArrayTypes, IntArrayTypes, NDArray[bool], IntArrayTypes]:
+    """returns parallel arrays of span starts, ends, lost flags and lengths
+
+    Notes
+    -----
+    start and end are 0 for lost spans
+    """
+    num = len(spans)
+    starts = numpy.fromiter(
+        (0 if s.lost else s.start for s in spans), dtype=numpy.int64, count=num
+    )
+    ends = numpy.fromiter(
+        (0 if s.lost else s.end for s in spans), dtype=numpy.int64, count=num
+    )
+    lost = numpy.fromiter((s.lost for s in spans), dtype=bool, count=num)
+    lengths = numpy.fromiter((s.length for s in spans), dtype=numpy.int64, count=num)
+    return starts, ends, lost, lengths
+
+
+def _covered_locations(starts: IntArrayTypes, ends: IntArrayTypes) -> IntArrayTypes:
+    """returns [(start, end), ...] of the union of the intervals
+
+    Notes
+    -----
+    Abutting intervals are merged. The result has shape (n, 2).
+    """
+    # sweep line, each start opens an interval and each end closes one
+    positions, index = numpy.unique(
+        numpy.concatenate([starts, ends]), return_inverse=True
+    )
+    delta = numpy.zeros(len(positions), dtype=numpy.int64)
+    numpy.add.at(delta, index, numpy.repeat([1, -1], len(starts)))
+    depth = delta.cumsum()
+    prev_depth = numpy.concatenate([[0], depth[:-1]])
+    opens = positions[(depth > 0) & (prev_depth == 0)]
+    closes = positions[(depth == 0) & (prev_depth > 0)]
+    return numpy.column_stack([opens, closes])
+
+
+def _inverted_spans(
+    starts: IntArrayTypes,
+    ends: IntArrayTypes,
+    lost: NDArray[bool],
+    lengths: IntArrayTypes,
+    reverse: NDArray[bool],
+    parent_length: int,
+    offsets: Optional[IntArrayTypes] = None,
+) -> list[SpanTypes]:
+    """returns the spans of the inverse of a map defined by parallel arrays
+
+    Parameters
+    ----------
+    offsets
+        positions of the spans within the map, computed from lengths if
+        not provided
+
+    Raises
+    ------
+    ValueError if the non-lost spans overlap
+    """
+    keep = ~lost
+    if offsets is None:
+        offsets = lengths.cumsum() - lengths
+    offsets = offsets[keep]
+    lo, hi, rev = starts[keep], ends[keep], reverse[keep]
+    offset_ends = offsets + lengths[keep]
+    cum_starts = numpy.where(rev, offset_ends, offsets)
+    cum_ends = numpy.where(rev, offsets, offset_ends)
+    # equivalent to sorting (lo, hi, cum_start, cum_end) tuples, the
+    # remaining keys only matter if starts are tied
+    if not (numpy.diff(lo) > 0).all():
+        # not already ordered
+        order = numpy.argsort(lo, kind="stable")
+        if (numpy.diff(lo[order]) == 0).any():
+            order = numpy.lexsort((cum_ends, cum_starts, hi, lo))
+        lo, hi = lo[order], hi[order]
+        cum_starts, cum_ends = cum_starts[order], cum_ends[order]
+
+    new_starts, new_ends, new_lost, overlap = location_numba.invert_spans(
+        lo, hi, cum_starts, cum_ends, parent_length
+    )
+    if overlap >= 0:
+        raise ValueError(f"Uninvertable. Overlap: {lo[overlap]} < {hi[overlap - 1]}")
+
+    return [
+        LostSpan(end) if is_lost else Span(start, end, reverse=start > end)
+        for start, end, is_lost in zip(
+            new_starts.tolist(), new_ends.tolist(), new_lost.tolist()
+        )
+    ]
+
+
+# bit flags for the packed span representation
+_REVERSE, _TIDY_START, _TIDY_END, _LOST, _TERMINAL = 1, 2, 4, 8, 16
+_PACKED_DTYPE = "<i8"
+
+
+def _pack_spans(spans: SeqSpanTypes) -> dict[str, Any]:
+    """returns spans packed as a base64 encoded (n, 3) int64 array
+
+    Notes
+    -----
+    Each row is (start, end, flags). For lost spans, start is 0 and end is
+    the span length. Span values are not supported.
+    """
+    packed = numpy.empty((len(spans), 3), dtype=_PACKED_DTYPE)
+    for i, span in enumerate(spans):
+        if span.value is not None:
+            raise ValueError("cannot pack spans with a value")
+        if span.lost:
+            flags = _LOST | (_TERMINAL if span.terminal else 0)
+            packed[i] = 0, span.length, flags
+            continue
+        flags = (
+            (_REVERSE if span.reverse else 0)
+            | (_TIDY_START if span.tidy_start else 0)
+            | (_TIDY_END if span.tidy_end else 0)
+        )
+        packed[i] = span.start, span.end, flags
+    return {
+        "shape": list(packed.shape),
+        "data": base64.b64encode(packed.tobytes()).decode("ascii"),
+    }
+
+
+def _unpack_spans(data: dict[str, Any]) -> list[SpanTypes]:
+    """inverse of _pack_spans"""
+    packed = numpy.frombuffer(
+        base64.b64decode(data["data"]), dtype=_PACKED_DTYPE
+    ).reshape(data["shape"])
+    spans = []
+    for start, end, flags in packed.tolist():
+        if flags & _TERMINAL:
+            spans.append(TerminalPadding(end))
+        elif flags & _LOST:
+            spans.append(LostSpan(end))
+        else:
+            spans.append(
+                Span(
+                    start,
+                    end,
+                    tidy_start=bool(flags & _TIDY_START),
+                    tidy_end=bool(flags & _TIDY_END),
+                    reverse=bool(flags & _REVERSE),
+                )
+            )
+    return spans
+
+
 class Map:  # pragma: no cover
     """A map holds a list of spans."""
 
@@ -524,48 +794,37 @@ class Map:  # pragma: no cover
         termini_unknown=False,
     ):
         assert parent_length is not None
-        d = locals()
-        exclude = ("self", "__class__", "__slots__")
-        self._serialisable = {k: v for k, v in d.items() if k not in exclude}
+        self._serialisable = {
+            "locations": locations,
+            "spans": spans,
+            "tidy": tidy,
+            "parent_length": parent_length,
+            "termini_unknown": termini_unknown,
+        }
 
         if spans is None:
+            locs = numpy.asarray(locations).reshape(-1, 2)
+            mins, maxs = locs.min(axis=1), locs.max(axis=1)
+            if (outside := (maxs < 0) | (mins > parent_length)).any():
+                start, end = locs[outside][0].tolist()
+                raise RuntimeError(
+                    f"located outside sequence: {(start, end, parent_length)}"
+                )
+            # parts of a location beyond the parent become LostSpans
+            left_lost = numpy.where(mins < 0, -mins, 0)
+            right_lost = numpy.where(maxs > parent_length, maxs - parent_length, 0)
             spans = []
-            for start, end in locations:
-                diff = 0
-                reverse = start > end
-                if max(start, end) < 0 or min(start, end) > parent_length:
-                    raise RuntimeError(
-                        f"located outside sequence: {(start, end, parent_length)}"
-                    )
-                if max(start, end) > parent_length and min(start, end) < 0:
-                    l_diff = min(start, end)
-                    r_diff = max(start, end) - parent_length
-                    start, end = (
-                        (0, parent_length) if start < end else (parent_length, 0)
-                    )
-                    spans += [
-                        LostSpan(abs(l_diff)),
-                        Span(start, end, tidy, tidy, reverse=reverse),
-                        LostSpan(abs(r_diff)),
-                    ]
-                elif min(start, end) < 0:
-                    diff = min(start, end)
-                    start = 0 if start < 0 else start
-                    end = 0 if end < 0 else end
-                    spans += [
-                        LostSpan(abs(diff)),
-                        Span(start, end, tidy, tidy, reverse=reverse),
-                    ]
-                elif max(start, end) > parent_length:
-                    diff = max(start, end) - parent_length
-                    start = parent_length if start > parent_length else start
-                    end = parent_length if end > parent_length else end
-                    spans += [
-                        Span(start, end, tidy, tidy, reverse=reverse),
-                        LostSpan(abs(diff)),
-                    ]
-                else:
-                    spans += [Span(start, end, tidy, tidy, reverse=reverse)]
+            for (start, end), reverse, l_diff, r_diff in zip(
+                locs.clip(0, parent_length).tolist(),
+                (locs[:, 0] > locs[:, 1]).tolist(),
+                left_lost.tolist(),
+                right_lost.tolist(),
+            ):
+                if l_diff:
+                    spans.append(LostSpan(l_diff))
+                spans.append(Span(start, end, tidy, tidy, reverse=reverse))
+                if r_diff:
+                    spans.append(LostSpan(r_diff))
 
         self.offsets = []
         self.useful = False
@@ -595,6 +854,11 @@ class Map:  # pragma: no cover
                 spans[-1] = TerminalPadding(spans[-1].length)
 
         self.spans = tuple(spans)
+        self._offsets_arr = numpy.array(self.offsets, dtype=numpy.int64)
+        self._remap_hint = 0
+        self._starts, self._ends, self._lost_mask, self._lengths = _spans_to_arrays(
+            self.spans
+        )
         self.length = posn
         self.parent_length = parent_length
         self.__inverse = None
@@ -651,31 +915,9 @@ class Map:  # pragma: no cover
         """>>> Map([(10,20), (15, 25), (80, 90)]).covered().spans
         [Span(10,25), Span(80, 90)]"""
 
-        delta = {}
-        for span in self.spans:
-            if span.lost:
-                continue
-            delta[span.start] = delta.get(span.start, 0) + 1
-            delta[span.end] = delta.get(span.end, 0) - 1
-        positions = list(delta.keys())
-        positions.sort()
-        last_y = y = 0
-        last_x = start = None
-        result = []
-        for x in positions:
-            y += delta[x]
-            if x == last_x:
-                continue
-            if y and not last_y:
-                assert start is None
-                start = x
-            elif last_y and not y:
-                result.append((start, x))
-                start = None
-            last_x = x
-            last_y = y
-        assert y == 0
-        return Map(locations=result, parent_length=self.parent_length)
+        keep = ~self._lost_mask
+        result = _covered_locations(self._starts[keep], self._ends[keep])
+        return Map(locations=result.tolist(), parent_length=self.parent_length)
 
     def reversed(self):
         """Reversed location on same parent"""
@@ -690,42 +932,32 @@ class Map:  # pragma: no cover
 
     def get_gap_coordinates(self):
         """returns [(gap pos, gap length), ...]"""
-        gap_pos = []
-        for i, span in enumerate(self.spans):
-            if not span.lost:
-                continue
-
-            pos = self.spans[i - 1].end if i else 0
-            gap_pos.append((pos, len(span)))
-
-        return gap_pos
+        (indices,) = numpy.where(self._lost_mask)
+        # gap position is the end of the preceding span, 0 if first
+        pos = numpy.where(indices > 0, self._ends[indices - 1], 0)
+        return list(zip(pos.tolist(), self._lengths[indices].tolist()))
+
+    def _offset_locations(self, lost: bool) -> list[tuple[int, int]]:
+        """returns [(offset, offset + length), ...] of lost or non-lost spans"""
+        mask = self._lost_mask if lost else ~self._lost_mask
+        starts = self._offsets_arr[mask]
+        ends = starts + self._lengths[mask]
+        return list(zip(starts.tolist(), ends.tolist()))
 
     def gaps(self):
         """The gaps (lost spans) in this map"""
-        locations = []
-        offset = 0
-        for s in self.spans:
-            if s.lost:
-                locations.append((offset, offset + s.length))
-            offset += s.length
-        return Map(locations, parent_length=len(self))
+        return Map(self._offset_locations(True), parent_length=len(self))
 
     def shadow(self):
         """The 'negative' map of the spans not included in this map"""
         return self.inverse().gaps()
 
     def nongap(self):
-        locations = []
-        offset = 0
-        for s in self.spans:
-            if not s.lost:
-                locations.append((offset, offset + s.length))
-            offset += s.length
-        return Map(locations, parent_length=len(self))
+        return Map(self._offset_locations(False), parent_length=len(self))
 
     def without_gaps(self):
         return Map(
-            spans=[s for s in self.spans if not s.lost],
+            spans=list(compress(self.spans, ~self._lost_mask)),
             parent_length=self.parent_length,
         )
 
@@ -739,28 +971,20 @@ class Map:  # pragma: no cover
         # tidy ends don't survive inversion
         if self.parent_length is None:
             raise ValueError("Uninvertable. parent length not known")
-        posn = 0
-        temp = []
-        for span in self.spans:
-            if not span.lost:
-                if span.reverse:
-                    temp.append((span.start, span.end, posn + span.length, posn))
-                else:
-                    temp.append((span.start, span.end, posn, posn + span.length))
-            posn += span.length
-
-        temp.sort()
-        new_spans = []
-        last_hi = 0
-        for lo, hi, start, end in temp:
-            if lo > last_hi:
-                new_spans.append(LostSpan(lo - last_hi))
-            elif lo < last_hi:
-                raise ValueError(f"Uninvertable. Overlap: {lo} < {last_hi}")
-            new_spans.append(Span(start, end, reverse=start > end))
-            last_hi = hi
-        if self.parent_length > last_hi:
-            new_spans.append(LostSpan(self.parent_length - last_hi))
+        reverse = numpy.fromiter(
+            (not s.lost and s.reverse for s in self.spans),
+            dtype=bool,
+            count=len(self.spans),
+        )
+        new_spans = _inverted_spans(
+            self._starts,
+            self._ends,
+            self._lost_mask,
+            self._lengths,
+            reverse,
+            self.parent_length,
+            offsets=self._offsets_arr,
+        )
         return Map(spans=new_spans, parent_length=len(self))
 
     def get_coordinates(self):
@@ -769,24 +993,20 @@ class Map:  # pragma: no cover
         v1/v2 are (start, end) unless the map is reversed, in which case it will
         be (end, start)"""
 
+        keep = ~self._lost_mask
+        starts, ends = self._starts[keep].tolist(), self._ends[keep].tolist()
         if self.reverse:
-            order_func = lambda x: (max(x), min(x))
-        else:
-            order_func = lambda x: x
-
-        coords = list(
-            map(order_func, [(s.start, s.end) for s in self.spans if not s.lost])
-        )
-
-        return coords
+            starts, ends = ends, starts
+        return list(zip(starts, ends))
 
     def to_rich_dict(self):
         """returns dicts for contained spans [dict(), ..]"""
         spans = [s.to_rich_dict() for s in self.spans]
-        data = copy.deepcopy(self._serialisable)
+        # locations and spans are the only containers and are replaced
+        data = dict(self._serialisable)
         data.pop("locations", None)
         data["spans"] = spans
-        data["type"] = get_object_provenance(self)
+        data["type"] = _class_provenance(type(self))
         data["version"] = __version__
         return data
 
@@ -802,8 +1022,6 @@ class Map:  # pragma: no cover
         """
         # todo there's probably a more efficient way to do this
         # create the new instance
-        from cogent3.util.deserialise import deserialise_map_spans
-
         data = self.to_rich_dict()
         zeroed = deserialise_map_spans(data)
         zeroed.parent_length = len(zeroed.get_covering_span())
@@ -814,10 +1032,14 @@ class Map:  # pragma: no cover
                 continue
             span.start -= shift
             span.end -= shift
+            span._update_key()
             new_end = max(new_end, span.end)
 
         zeroed.start = 0
         zeroed.end = new_end
+        zeroed._starts, zeroed._ends, zeroed._lost_mask, zeroed._lengths = (
+            _spans_to_arrays(zeroed.spans)
+        )
 
         return zeroed
 
@@ -830,10 +1052,11 @@ class Map:  # pragma: no cover
         ------
         raises ValueError if rel_pos < 0
         """
-        check = (
-            numpy.array([rel_pos], dtype=int) if isinstance(rel_pos, int) else rel_pos
-        )
-        if check.min() < 0:
+        if isinstance(rel_pos, (int, numpy.integer)):
+            negative = rel_pos < 0
+        else:
+            negative = rel_pos.min() < 0
+        if negative:
             raise ValueError(f"must positive, not {rel_pos=}")
 
         if len(self) == self.parent_length:
@@ -849,10 +1072,11 @@ class Map:  # pragma: no cover
         ------
         raises ValueError if abs_pos < 0
         """
-        check = (
-            numpy.array([abs_pos], dtype=int) if isinstance(abs_pos, int) else abs_pos
-        )
-        if check.min() < 0:
+        if isinstance(abs_pos, (int, numpy.integer)):
+            negative = abs_pos < 0
+        else:
+            negative = abs_pos.min() < 0
+        if negative:
             raise ValueError(f"must positive, not {abs_pos=}")
         return abs_pos - self.start
 
@@ -862,15 +1086,30 @@ class MapABC(ABC):
 
     def __new__(cls, *args, **kwargs):
         obj = object.__new__(cls)
-        init_sig = inspect.signature(cls.__init__)
-        bargs = init_sig.bind_partial(cls, *args, **kwargs)
-        bargs.apply_defaults()
-        init_vals = bargs.arguments
-        init_vals.pop("self", None)
-
-        obj._serialisable = init_vals
+        names, defaults = cls._get_init_schema()
+        init_vals = {**defaults, **dict(zip(names, args)), **kwargs}
+        # preserve the signature order of arguments
+        obj._serialisable = {n: init_vals[n] for n in names if n in init_vals}
         return obj
 
+    @classmethod
+    def _get_init_schema(cls) -> tuple[tuple[str, ...], dict[str, Any]]:
+        """returns the __init__ parameter names and defaults for cls
+
+        Notes
+        -----
+        Computed on first use, not in __init_subclass__, since the
+        dataclass decorator creates __init__ after the class is defined.
+        """
+        schema = cls.__dict__.get("_init_schema")
+        if schema is None:
+            params = list(inspect.signature(cls.__init__).parameters.values())[1:]
+            names = tuple(p.name for p in params)
+            defaults = {p.name: p.default for p in params if p.default is not p.empty}
+            schema = names, defaults
+            cls._init_schema = schema
+        return schema
+
     @abstractmethod
     def __len__(self) -> int: ...
 
@@ -915,23 +1154,29 @@ def _spans_from_locations(locations: SeqCoordTypes, parent_length: int) -> SeqSp
     if locations[0][0] > locations[-1][1]:
         raise ValueError(f"locations must be ordered smallest-> largest {locations}")
 
-    spans = []
-    for start, end in locations:
-        if start > end or min(start, end) < 0:
-            raise ValueError("locations must be ordered smallest-> largest and >= 0")
-        if start > parent_length:
-            raise RuntimeError(
-                f"located outside sequence: {(start, end, parent_length)}"
-            )
-        if end > parent_length:
-            diff = end - parent_length
-            end = min(end, parent_length)
-            spans += [
-                Span(start, end),
-                LostSpan(abs(diff)),
-            ]
-        else:
-            spans += [Span(start, end)]
+    locs = numpy.asarray(locations, dtype=numpy.int64).reshape(-1, 2)
+    starts, ends = locs[:, 0], locs[:, 1]
+    if (starts > ends).any() or (starts < 0).any():
+        raise ValueError("locations must be ordered smallest-> largest and >= 0")
+
+    if (outside := starts > parent_length).any():
+        start, end = locs[outside][0].tolist()
+        raise RuntimeError(f"located outside sequence: {(start, end, parent_length)}")
+
+    # rows extending beyond the parent get a trailing LostSpan
+    over = ends > parent_length
+    spans = [None] * (len(locs) + int(over.sum()))
+    i = 0
+    for start, end, diff in zip(
+        starts.tolist(),
+        numpy.minimum(ends, parent_length).tolist(),
+        (ends - parent_length).tolist(),
+    ):
+        spans[i] = Span(start, end)
+        i += 1
+        if diff > 0:
+            spans[i] = LostSpan(diff)
+            i += 1
 
     return tuple(spans)
 
@@ -952,19 +1197,13 @@ def spans_to_gap_coords(
     -------
     numpy.array([gap pos,...]), numpy.array([cum gap length,...]),
     """
-    gap_pos = []
-    cum_lengths = []
-    cum_length = 0
-    for i, span in enumerate(indel_spans):
-        if not span.lost:
-            continue
-
-        pos = indel_spans[i - 1].end if i else 0
-        cum_length += len(span)
-        gap_pos.append(pos)
-        cum_lengths.append(cum_length)
-
-    return numpy.array(gap_pos, dtype=dtype), numpy.array(cum_lengths, dtype=dtype)
+    _, ends, lost, lengths = _spans_to_arrays(indel_spans)
+    # a gap is positioned at the end of the preceding span
+    prev_ends = numpy.zeros_like(ends)
+    prev_ends[1:] = ends[:-1]
+    gap_pos = prev_ends[lost].astype(dtype)
+    cum_lengths = lengths[lost].cumsum().astype(dtype)
+    return gap_pos, cum_lengths
 
 
 def _gap_spans(
@@ -983,6 +1222,11 @@ def _gap_spans(
     return starts, ends
 
 
+def _gap_dtype_for(max_value: int) -> type:
+    """returns _DEFAULT_GAP_DTYPE if it can represent max_value, else int64"""
+    return _DEFAULT_GAP_DTYPE if max_value <= _MAX_DEFAULT_GAP_VALUE else numpy.int64
+
+
 def _update_lengths(
     result_pos: IntArrayTypes,
     result_lengths: IntArrayTypes,
@@ -994,12 +1238,12 @@ def _update_lengths(
 
     Notes
     -----
-    result_pos is a superset of gap_pos
+    result_pos is a sorted superset of gap_pos. Both are sorted as they are
+    IndelMap gap positions, which allows a single linear pass.
     """
-    _, result_indices, other_indices = numpy.intersect1d(
-        result_pos, gap_pos, assume_unique=True, return_indices=True
-    )
-    result_lengths[result_indices] += gap_lengths[other_indices]
+    if __debug__:
+        assert (numpy.diff(gap_pos) > 0).all(), "gap_pos must be sorted"
+    location_numba.update_lengths(result_pos, result_lengths, gap_pos, gap_lengths)
 
 
 @dataclasses.dataclass
@@ -1029,6 +1273,19 @@ class IndelMap(MapABC):
     parent_length: int = 0
     _serialisable: dict = dataclasses.field(init=False, repr=False)
     num_gaps: int = dataclasses.field(init=False, repr=False, default=0)
+    _gap_lengths: Optional[IntArrayTypes] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _gap_starts: Optional[IntArrayTypes] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _gap_ends: Optional[IntArrayTypes] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _eytzinger: Optional[dict] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _length: int = dataclasses.field(init=False, repr=False, compare=False, default=0)
 
     def __post_init__(self, gap_lengths: IntArrayTypes):
         assert gap_lengths is None or self.cum_gap_lengths is None
@@ -1047,11 +1304,54 @@ class IndelMap(MapABC):
                 f"gap position {self.gap_pos[-1]} outside parent_length {self.parent_length}"
             )
 
+        # the aligned length, which is also the largest alignment coordinate
+        self._length = int(
+            self.parent_length + (self.cum_gap_lengths[-1] if self.num_gaps else 0)
+        )
+        # use the default dtype unless alignment coordinates exceed it
+        dtype = _gap_dtype_for(self._length)
+        self.gap_pos = self.gap_pos.astype(dtype, copy=False)
+        self.cum_gap_lengths = self.cum_gap_lengths.astype(dtype, copy=False)
+
         # make gap array immutable
         self.gap_pos.flags.writeable = False
         self.cum_gap_lengths.flags.writeable = False
         self._serialisable.pop("gap_lengths", None)
 
+    @property
+    def _gap_align_spans(self) -> tuple[IntArrayTypes, IntArrayTypes]:
+        """cached alignment coordinates of gap starts, gap ends"""
+        if self._gap_starts is None:
+            starts, ends = _gap_spans(self.gap_pos, self.cum_gap_lengths)
+            starts.flags.writeable = False
+            ends.flags.writeable = False
+            self._gap_starts, self._gap_ends = starts, ends
+        return self._gap_starts, self._gap_ends
+
+    def _search_layout(self, attr: str) -> tuple[IntArrayTypes, IntArrayTypes]:
+        """returns the Eytzinger layout of gap_pos or gap ends
+
+        Parameters
+        ----------
+        attr
+            either "gap_pos" or "gap_ends"
+
+        Notes
+        -----
+        The layout is built on first use. For maps with fewer gaps than
+        _EYTZINGER_THRESHOLD, returns empty arrays so the numba kernels
+        use a standard binary search.
+        """
+        values = self.gap_pos if attr == "gap_pos" else self._gap_align_spans[1]
+        if self.num_gaps < _EYTZINGER_THRESHOLD:
+            return values[:0], _EMPTY_ORDER
+
+        if self._eytzinger is None:
+            self._eytzinger = {}
+        if attr not in self._eytzinger:
+            self._eytzinger[attr] = location_numba.eytzinger_layout(values)
+        return self._eytzinger[attr]
+
     @classmethod
     def from_spans(
         cls, spans: SeqSpanTypes, parent_length: int, termini_unknown: bool = False
@@ -1078,11 +1378,14 @@ class IndelMap(MapABC):
         aligned_length
             length of the alignment
         """
-        locations = list(locations)
-        if not locations or (
+        if not isinstance(locations, numpy.ndarray):
+            locations = list(locations)
+        dtype = _gap_dtype_for(aligned_length)
+        locations = numpy.asarray(locations, dtype=dtype).reshape(-1, 2)
+        if not len(locations) or (
             len(locations) == 1
-            and locations[0][0] == 0
-            and locations[0][-1] == aligned_length
+            and locations[0, 0] == 0
+            and locations[0, 1] == aligned_length
         ):
             empty = numpy.array([], dtype=_DEFAULT_GAP_DTYPE)
             return cls(
@@ -1091,18 +1394,22 @@ class IndelMap(MapABC):
                 parent_length=aligned_length,
             )
 
-        if locations[0][0] != 0:
+        parts = []
+        if locations[0, 0] != 0:
             # starts with a gap
-            locations = [(0, 0)] + locations
-        if locations[-1][1] < aligned_length:
+            parts.append(numpy.zeros((1, 2), dtype=dtype))
+        parts.append(locations)
+        if locations[-1, 1] < aligned_length:
             # ends with a gap
-            locations += [(aligned_length, aligned_length)]
-
-        locations = numpy.array(locations, dtype=_DEFAULT_GAP_DTYPE).flatten()[1:-1]
-        gap_coords = locations.reshape((locations.shape[0] // 2, 2))
-        gap_ends, gap_starts = gap_coords[:, ::-1].T
-        gap_lengths = gap_ends - gap_starts
-        cum_lens = gap_lengths.cumsum()
+            parts.append(numpy.full((1, 2), aligned_length, dtype=dtype))
+        if len(parts) > 1:
+            locations = numpy.vstack(parts)
+
+        # gaps lie between the end of one segment and start of the next
+        gap_starts = locations[:-1, 1]
+        gap_lengths = locations[1:, 0] - gap_starts
+        # gap_lengths is a new array so we accumulate in place
+        cum_lens = numpy.add.accumulate(gap_lengths, out=gap_lengths)
         # convert to sequence coords
         gap_pos = gap_starts.copy()
         gap_pos[1:] -= cum_lens[:-1]
@@ -1160,71 +1467,17 @@ class IndelMap(MapABC):
         if not self.num_gaps:
             return no_gaps
 
-        first_gap = self.gap_pos[0]
-        last_gap = self.gap_pos[-1] + self.cum_gap_lengths[-1]
-        if stop < first_gap or start >= last_gap:
+        gap_starts, gap_ends = self._gap_align_spans
+        if stop < self.gap_pos[0] or start >= gap_ends[-1]:
             return no_gaps
 
-        gap_starts, gap_ends = _gap_spans(self.gap_pos, self.cum_gap_lengths)
-        gap_pos = self.gap_pos.copy()
-        cum_lengths = self.cum_gap_lengths.copy()
-        # we find where the slice starts
-        l = numpy.searchsorted(gap_ends, start, side="left")
-        if gap_starts[l] <= start < gap_ends[l] and stop <= gap_ends[l]:
-            # entire span is within a single gap
-            # pos now 0
-            gap_pos = numpy.array([0], dtype=_DEFAULT_GAP_DTYPE)
-            cum_lengths = cum_lengths[l : l + 1]
-            cum_lengths[0] = stop - start
-            return self.__class__(
-                gap_pos=gap_pos, cum_gap_lengths=cum_lengths, parent_length=0
-            )
-
-        lengths = self.get_gap_lengths()
-        if start < first_gap:
-            # start is before the first gap, we don't slice or shift
-            shift = start
-            begin = 0
-        elif gap_starts[l] <= start < gap_ends[l]:
-            # start is within a gap
-            # so the absolute gap_pos value remains unchanged, but we shorten
-            # the gap length
-            begin = l
-            begin_diff = start - gap_starts[l]
-            lengths[l] -= begin_diff
-            shift = (start - cum_lengths[l - 1] - begin_diff) if l else gap_pos[0]
-        elif start == gap_ends[l]:
-            # at gap boundary, so beginning of non-gapped segment
-            # no adjustment to gap lengths
-            begin = l + 1
-            shift = start - cum_lengths[l]
-        else:
-            # not within a gap
-            begin = l
-            shift = start - cum_lengths[l - 1] if l else start
-
-        # start search for stop from l index
-        r = numpy.searchsorted(gap_ends[l:], stop, side="right") + l
-        if r == self.num_gaps:
-            # stop is after last gap
-            end = r
-        elif gap_starts[r] < stop <= gap_ends[r]:
-            # within gap
-            end = r + 1
-            end_diff = gap_ends[r] - stop
-            lengths[r] -= end_diff
-        else:
-            end = r
-
-        pos_result = gap_pos[begin:end]
-        pos_result -= shift
-        lengths = lengths[begin:end]
-        parent_length = self.get_seq_index(stop) - self.get_seq_index(start)
-
+        gap_pos, cum_lengths, parent_length = location_numba.slice_indel_map(
+            self.gap_pos, self.cum_gap_lengths, gap_starts, gap_ends, start, stop
+        )
         return self.__class__(
-            gap_pos=pos_result,
-            gap_lengths=lengths,
-            parent_length=parent_length,
+            gap_pos=gap_pos,
+            cum_gap_lengths=cum_lengths,
+            parent_length=int(parent_length),
         )
 
     def get_align_index(self, seq_index: int, slice_stop: bool = False) -> int:
@@ -1239,8 +1492,6 @@ class IndelMap(MapABC):
             In that case, and if seq_index is in gap_pos then it returns
             the first alignment index of the gap run.
         """
-        cum_lengths = self.cum_gap_lengths
-        gap_pos = self.gap_pos
         # NOTE I explicitly cast all returned values to python int's due to
         # need for json serialisation, which does not support numpy int classes
         if seq_index < 0:
@@ -1249,31 +1500,18 @@ class IndelMap(MapABC):
         if seq_index < 0:
             raise IndexError(f"{seq_index} negative seq_index beyond limit ")
 
-        if not self.num_gaps or seq_index < gap_pos[0]:
+        if not self.num_gaps or seq_index < self.gap_pos[0]:
             return int(seq_index)
 
-        # if stop_index, check if the seq_index corresponds to a gap position
-        if slice_stop and (match := seq_index == gap_pos).any():
-            # if so, we return the alignment coord for the first gap position
-            (idx,) = numpy.where(match)[0]
-            if idx:
-                gap_len = cum_lengths[idx] - cum_lengths[idx - 1]
-            else:
-                gap_len = cum_lengths[idx]
-            gap_end = gap_pos[idx] + cum_lengths[idx]
-            return int(gap_end - gap_len)
-
-        if seq_index >= gap_pos[-1]:
-            return int(seq_index + cum_lengths[-1])
-
-        # find gap position before seq_index
-        index = numpy.searchsorted(gap_pos, seq_index, side="left")
-        if seq_index < gap_pos[index]:
-            gap_lengths = cum_lengths[index - 1] if index else 0
-        else:
-            gap_lengths = cum_lengths[index]
-
-        return int(seq_index + gap_lengths)
+        return int(
+            location_numba.align_index(
+                self.gap_pos,
+                self.cum_gap_lengths,
+                *self._search_layout("gap_pos"),
+                seq_index,
+                slice_stop,
+            )
+        )
 
     def get_seq_index(self, align_index: int) -> int:
         """converts alignment index to sequence index"""
@@ -1288,40 +1526,88 @@ class IndelMap(MapABC):
             return align_index
 
         # these are alignment indices for gaps
-        cum_lengths = self.cum_gap_lengths
-        gap_starts, gap_ends = _gap_spans(self.gap_pos, cum_lengths)
-        if align_index >= gap_ends[-1]:
-            return int(align_index - cum_lengths[-1])
+        gap_starts, gap_ends = self._gap_align_spans
+        return int(
+            location_numba.seq_index(
+                self.gap_pos,
+                self.cum_gap_lengths,
+                gap_starts,
+                gap_ends,
+                *self._search_layout("gap_ends"),
+                align_index,
+            )
+        )
 
-        index = numpy.searchsorted(gap_ends, align_index, side="left")
-        if align_index < gap_starts[index]:
-            # before the gap at index
-            return int(align_index - cum_lengths[index - 1])
+    def get_align_indices(
+        self, seq_indices: IntArrayTypes, slice_stop: bool = False
+    ) -> IntArrayTypes:
+        """vectorised get_align_index()
 
-        if align_index == gap_ends[index]:
-            # after the gap at index
-            return int(align_index - cum_lengths[index])
+        Parameters
+        ----------
+        seq_indices
+            coordinates on the sequence, negative values are relative to
+            parent_length
+        slice_stop
+            applies to all elements, see get_align_index()
+        """
+        seq_indices = numpy.asarray(seq_indices, dtype=numpy.int64)
+        seq_indices = numpy.where(
+            seq_indices < 0, seq_indices + self.parent_length, seq_indices
+        )
+        if (seq_indices < 0).any():
+            raise IndexError("negative seq_index beyond limit")
+
+        return location_numba.align_indices(
+            self.gap_pos,
+            self.cum_gap_lengths,
+            *self._search_layout("gap_pos"),
+            seq_indices,
+            slice_stop,
+        )
 
-        if gap_starts[index] <= align_index < gap_ends[index]:
-            # within the gap at index
-            # so the gap insertion position is the sequence position
-            return int(self.gap_pos[index])
+    def get_seq_indices(self, align_indices: IntArrayTypes) -> IntArrayTypes:
+        """vectorised get_seq_index()
+
+        Parameters
+        ----------
+        align_indices
+            coordinates on the alignment, negative values are relative to
+            len(self)
+        """
+        align_indices = numpy.asarray(align_indices, dtype=numpy.int64)
+        align_indices = numpy.where(
+            align_indices < 0, align_indices + len(self), align_indices
+        )
+        if (align_indices < 0).any():
+            raise IndexError("align_index beyond limit")
+
+        gap_starts, gap_ends = self._gap_align_spans
+        return location_numba.seq_indices(
+            self.gap_pos,
+            self.cum_gap_lengths,
+            gap_starts,
+            gap_ends,
+            *self._search_layout("gap_ends"),
+            align_indices,
+        )
 
     def __len__(self) -> int:
-        length_gaps = self.cum_gap_lengths[-1] if self.num_gaps else 0
-        return int(self.parent_length + length_gaps)
+        return self._length
 
     def __add__(self, other: "IndelMap") -> "IndelMap":
         """designed to support concatenation of two aligned sequences"""
-        gap_pos = self.gap_pos.tolist() + (self.parent_length + other.gap_pos).tolist()
-        gap_pos = numpy.array(gap_pos, dtype=_DEFAULT_GAP_DTYPE)
+        dtype = _gap_dtype_for(len(self) + len(other))
+        gap_pos = numpy.concatenate(
+            [self.gap_pos, other.gap_pos.astype(dtype) + self.parent_length],
+            dtype=dtype,
+        )
 
         cum_length = self.cum_gap_lengths[-1] if self.num_gaps else 0
-        cum_gap_lengths = (
-            self.cum_gap_lengths.tolist()
-            + (cum_length + other.cum_gap_lengths).tolist()
+        cum_gap_lengths = numpy.concatenate(
+            [self.cum_gap_lengths, other.cum_gap_lengths.astype(dtype) + cum_length],
+            dtype=dtype,
         )
-        cum_gap_lengths = numpy.array(cum_gap_lengths, dtype=_DEFAULT_GAP_DTYPE)
 
         return self.__class__(
             gap_pos=gap_pos,
@@ -1331,8 +1617,9 @@ class IndelMap(MapABC):
 
     def __mul__(self, scale: int) -> "IndelMap":
         """used for going from amino-acid alignment to codon alignment"""
-        gap_pos = self.gap_pos * scale
-        cum_gap_lengths = self.cum_gap_lengths * scale
+        dtype = _gap_dtype_for(len(self) * scale)
+        gap_pos = self.gap_pos.astype(dtype) * scale
+        cum_gap_lengths = self.cum_gap_lengths.astype(dtype) * scale
         return self.__class__(
             gap_pos=gap_pos,
             cum_gap_lengths=cum_gap_lengths,
@@ -1344,31 +1631,41 @@ class IndelMap(MapABC):
         return f"{gap_data.tolist()!r}/{self.parent_length}"
 
     def get_gap_lengths(self) -> IntArrayTypes:
-        lengths = self.cum_gap_lengths.copy()
-        lengths[1:] = numpy.diff(lengths)
-        return lengths
+        """returns the length of each gap segment
+
+        Notes
+        -----
+        The result is cached and is not writeable.
+        """
+        if self._gap_lengths is None:
+            cum = self.cum_gap_lengths
+            lengths = numpy.empty_like(cum)
+            if cum.size:
+                lengths[0] = cum[0]
+                numpy.subtract(cum[1:], cum[:-1], out=lengths[1:])
+            lengths.flags.writeable = False
+            self._gap_lengths = lengths
+        return self._gap_lengths
 
     def nongap(self) -> Iterator[SpanTypes]:
         """ungappeed segments in this map in aligned coordinates"""
         # we want to know the coordinates of the ungapped segments on
-        # the aligned sequence. The gap_pos attribute is in sequence
-        # coordinates
-        prev_pos = 0
-        for i, pos in enumerate(self.gap_pos):
-            if pos == 0:
-                # we start with a gap
-                prev_pos = pos
-                continue
+        # the aligned sequence. These lie between the alignment coordinates
+        # of consecutive gaps
+        if not self.num_gaps:
+            return
 
-            cum_length = 0 if i == 0 else self.cum_gap_lengths[i - 1]
-            start = 0 if i == 0 else prev_pos
-            start += cum_length
-            end = self.gap_pos[i] + cum_length
-            yield Span(start, end)
-            prev_pos = pos
+        gap_starts, gap_ends = self._gap_align_spans
+        starts = [0] + gap_ends[:-1].tolist()
+        ends = gap_starts.tolist()
+        for start, end in zip(starts, ends):
+            if end:
+                # skips a segment of zero length if we start with a gap
+                yield Span(start, end)
 
-        if self.num_gaps and self.gap_pos[-1] + self.cum_gap_lengths[-1] < len(self):
-            yield Span(self.gap_pos[-1] + self.cum_gap_lengths[-1], len(self))
+        last_end = int(gap_ends[-1])
+        if last_end < len(self):
+            yield Span(last_end, len(self))
 
     @property
     def spans(self) -> Iterator[SpanTypes]:
@@ -1377,29 +1674,20 @@ class IndelMap(MapABC):
             yield Span(0, self.parent_length)
             return
 
-        for i, pos in enumerate(self.gap_pos):
-            cum_length = self.cum_gap_lengths[i]
-            if pos == 0:
-                cls = TerminalPadding if self.termini_unknown else LostSpan
-                yield cls(cum_length)
-                continue
-
-            if i == 0:
-                start = 0
-                prev_length = 0
-            else:
-                start = self.gap_pos[i - 1]
-                prev_length = self.cum_gap_lengths[i - 1]
-            yield Span(start, pos)
-            cls = (
-                TerminalPadding
-                if self.termini_unknown and i == self.num_gaps - 1
-                else LostSpan
-            )
-            yield cls(cum_length - prev_length)
-
-        if self.num_gaps and self.gap_pos[-1] < self.parent_length:
-            yield Span(self.gap_pos[-1], self.parent_length)
+        gap_pos = self.gap_pos.tolist()
+        lengths = self.get_gap_lengths().tolist()
+        last = self.num_gaps - 1
+        starts = [0] + gap_pos[:-1]
+        for i, (start, pos, length) in enumerate(zip(starts, gap_pos, lengths)):
+            if pos:
+                yield Span(start, pos)
+            # only a gap at the beginning can have pos == 0
+            terminal = self.termini_unknown and (not pos or i == last)
+            cls = TerminalPadding if terminal else LostSpan
+            yield cls(length)
+
+        if gap_pos[-1] < self.parent_length:
+            yield Span(gap_pos[-1], self.parent_length)
 
     @property
     def complete(self) -> bool:
@@ -1410,6 +1698,31 @@ class IndelMap(MapABC):
     def useful(self) -> bool:
         return self.parent_length != 0
 
+    def get_coordinates_array(self) -> IntArrayTypes:
+        """returns sequence coordinates of ungapped segments
+
+        Returns
+        -------
+        numpy array of shape (n, 2) with rows of (start, end)
+        """
+        if not self.num_gaps:
+            bounds = numpy.array([0, self.parent_length], dtype=numpy.int64)
+            return bounds.reshape((1, 2))
+
+        # segments lie between consecutive boundaries, which are the gap
+        # positions plus 0 if we don't start with a gap plus parent_length
+        # if we end with a gap
+        gap_pos = self.gap_pos.astype(numpy.int64)
+        head = [] if gap_pos[0] == 0 else [0]
+        tail = (
+            [self.parent_length]
+            if self.num_gaps == 1
+            or gap_pos[-1] + self.cum_gap_lengths[-1] < self.parent_length
+            else []
+        )
+        bounds = numpy.concatenate([head, gap_pos, tail]).astype(numpy.int64)
+        return numpy.column_stack([bounds[:-1], bounds[1:]])
+
     def get_coordinates(self) -> SeqCoordTypes:
         """returns sequence coordinates of ungapped segments
 
@@ -1417,32 +1730,13 @@ class IndelMap(MapABC):
         -------
         [(start, end), ...]
         """
-        if not self.num_gaps or (self.num_gaps == 1 and not self.gap_pos[0]):
-            return [(0, int(self.parent_length))]
-        elif self.num_gaps == 1:
-            # does not start with a gap
-            starts = [0, int(self.gap_pos[0])]
-            ends = [int(self.gap_pos[0]), self.parent_length]
-            return list(zip(starts, ends))
-
-        starts = self.gap_pos[:-1].tolist()
-        ends = self.gap_pos[1:].tolist()
-        if self.gap_pos[0]:
-            # does not start with a gap
-            ends = starts[:1] + ends
-            starts = [0] + starts
-
-        if self.gap_pos[-1] + self.cum_gap_lengths[-1] < self.parent_length:
-            # does end with a gap
-            starts.append(ends[-1])
-            ends.append(self.parent_length)
-
+        starts, ends = self.get_coordinates_array().T.tolist()
         return list(zip(starts, ends))
 
     def get_gap_coordinates(self) -> SeqCoordTypes:
         """returns [(gap pos, gap length), ...]"""
         lengths = self.get_gap_lengths()
-        return numpy.array([self.gap_pos, lengths]).T.tolist()
+        return numpy.column_stack([self.gap_pos, lengths]).tolist()
 
     def get_gap_align_coordinates(self) -> SeqCoordTypes:
         """returns [(gap start, gap end), ...] in alignment indices
@@ -1452,7 +1746,7 @@ class IndelMap(MapABC):
         A 2D numpy array of integers. If the result is empty, it still
         has shape (0, 2).
         """
-        starts, ends = _gap_spans(self.gap_pos, self.cum_gap_lengths)
+        starts, ends = self._gap_align_spans
         result = numpy.array([starts, ends]).T
         if not len(result):
             result = result.reshape((0, 2))
@@ -1468,8 +1762,13 @@ class IndelMap(MapABC):
         parent_length
             overrides property
         """
-        unique_pos = numpy.union1d(self.gap_pos, other.gap_pos)
-        gap_lengths = numpy.zeros(unique_pos.shape, dtype=_DEFAULT_GAP_DTYPE)
+        # gap positions are sorted and unique, so a linear merge suffices
+        dtype = _gap_dtype_for(len(self) + len(other))
+        unique_pos = location_numba.merge_sorted_unique(
+            self.gap_pos.astype(dtype, copy=False),
+            other.gap_pos.astype(dtype, copy=False),
+        )
+        gap_lengths = numpy.zeros(unique_pos.shape, dtype=dtype)
         self_lengths = self.get_gap_lengths()
         other_lengths = other.get_gap_lengths()
         _update_lengths(unique_pos, gap_lengths, self.gap_pos, self_lengths)
@@ -1477,7 +1776,7 @@ class IndelMap(MapABC):
         parent_length = parent_length or self.parent_length
         return self.__class__(
             gap_pos=unique_pos,
-            gap_lengths=gap_lengths,
+            cum_gap_lengths=numpy.add.accumulate(gap_lengths, out=gap_lengths),
             parent_length=parent_length,
         )
 
@@ -1490,27 +1789,26 @@ class IndelMap(MapABC):
             sequence insert gap coordinates [(gap start, gap end), ...]
         """
         coords = sorted(coords)
-        # using a dict here because joining can produce a gap merge
-        gaps = {}
-        cum_length = 0
+        dtype = self.gap_pos.dtype
+        pos_list = [numpy.array([], dtype=dtype)]
+        len_list = [numpy.array([], dtype=dtype)]
         cum_parent_length = 0
         for start, end in coords:
             im = self[start:end]
-            for i in range(im.num_gaps):
-                pos = im.gap_pos[i] + cum_parent_length
-                gaps[pos] = gaps.get(pos, cum_length) + im.cum_gap_lengths[i]
+            pos_list.append(im.gap_pos + cum_parent_length)
+            len_list.append(im.get_gap_lengths())
             cum_parent_length += im.parent_length
-            if im.num_gaps:
-                cum_length += im.cum_gap_lengths[-1]
-        gap_pos = numpy.empty(len(gaps), dtype=_DEFAULT_GAP_DTYPE)
-        cum_lengths = numpy.empty(len(gaps), dtype=_DEFAULT_GAP_DTYPE)
-        for i, (pos, length) in enumerate(sorted(gaps.items())):
-            gap_pos[i] = pos
-            cum_lengths[i] = length
+
+        # joining can produce a gap merge, so we sum lengths of gaps
+        # at the same position
+        all_pos = numpy.concatenate(pos_list)
+        gap_pos, inverse = numpy.unique(all_pos, return_inverse=True)
+        lengths = numpy.zeros(gap_pos.shape, dtype=dtype)
+        numpy.add.at(lengths, inverse, numpy.concatenate(len_list))
         return self.__class__(
-            gap_pos=gap_pos,
-            cum_gap_lengths=cum_lengths,
-            parent_length=cum_parent_length,
+            gap_pos=gap_pos.astype(dtype, copy=False),
+            cum_gap_lengths=numpy.add.accumulate(lengths, out=lengths),
+            parent_length=int(cum_parent_length),
         )
 
     def nucleic_reversed(self) -> "IndelMap":
@@ -1536,9 +1834,10 @@ class IndelMap(MapABC):
 
     def to_rich_dict(self) -> dict[str, Any]:
         """returns dicts for contained spans [dict(), ..]"""
-        # exclude spans from deep copy since being overwritten
-        data = copy.deepcopy(dict(self._serialisable.items()))
-        data["type"] = get_object_provenance(self)
+        # a shallow copy suffices, the gap arrays are immutable and are
+        # replaced by lists below, all other values are primitives
+        data = dict(self._serialisable)
+        data["type"] = _class_provenance(type(self))
         data["version"] = __version__
         data["gap_pos"] = self.gap_pos.tolist()
         data["cum_gap_lengths"] = self.cum_gap_lengths.tolist()
@@ -1550,8 +1849,6 @@ class IndelMap(MapABC):
 
     @classmethod
     def from_rich_dict(cls, map_element) -> "IndelMap":
-        from cogent3.util.deserialise import _get_class
-
         map_element.pop("version", None)
         type_ = map_element.pop("type")
         assert _get_class(type_) == cls
@@ -1585,15 +1882,10 @@ class IndelMap(MapABC):
         -----
         LostSpans in align_feature_map are skipped
         """
-        spans = []
-        for span in align_feature_map.spans:
-            if span.lost:
-                continue
-
-            start = self.get_seq_index(span.start)
-            end = self.get_seq_index(span.end)
-            spans.append(Span(start, end))
-
+        keep = ~align_feature_map._lost
+        starts = self.get_seq_indices(align_feature_map._starts[keep]).tolist()
+        ends = self.get_seq_indices(align_feature_map._ends[keep]).tolist()
+        spans = [Span(start, end) for start, end in zip(starts, ends)]
         return FeatureMap(spans=spans, parent_length=self.parent_length)
 
 
@@ -1604,12 +1896,27 @@ class FeatureMap(MapABC):
     spans: dataclasses.InitVar[Optional[SeqSpanTypes]] = ()
     parent_length: int = 0
     offsets: list[int] = dataclasses.field(init=False, repr=False)
+    _offsets_arr: IntArrayTypes = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _remap_hint: int = dataclasses.field(
+        init=False, repr=False, compare=False, default=0
+    )
     useful: bool = dataclasses.field(init=False, repr=False, default=False)
     complete: bool = dataclasses.field(init=False, repr=False, default=True)
     _serialisable: dict = dataclasses.field(init=False, repr=False)
     _spans: SeqSpanTypes = dataclasses.field(default=(), init=False)
     _start: Optional[int] = dataclasses.field(default=None, init=False)
     _end: Optional[int] = dataclasses.field(default=None, init=False)
+    # parallel arrays of span attributes, start and end are 0 for lost spans
+    _starts: IntArrayTypes = dataclasses.field(init=False, repr=False, compare=False)
+    _ends: IntArrayTypes = dataclasses.field(init=False, repr=False, compare=False)
+    _lost: NDArray[bool] = dataclasses.field(init=False, repr=False, compare=False)
+    _lengths: IntArrayTypes = dataclasses.field(init=False, repr=False, compare=False)
+    # reverse flags of spans, False for lost spans, see _get_reverse()
+    _reverse: Optional[NDArray[bool]] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
 
     def __post_init__(self, spans: SeqSpanTypes):
         assert self.parent_length is not None
@@ -1621,26 +1928,39 @@ class FeatureMap(MapABC):
             # and then set the default value here
             spans = ()
 
-        spans = tuple(spans)
-
-        self.offsets = []
-        self.useful = False
-        self.complete = True
-        posn = 0
-        for span in spans:
-            self.offsets.append(posn)
-            posn += span.length
-            if span.lost:
-                self.complete = False
-            elif not self.useful:
-                self.useful = True
-                self._start, self._end = span.start, span.end
-            else:
-                self._start = min(self._start, span.start)
-                self._end = max(self._end, span.end)
-
         self._spans = tuple(spans)
-        self.length = posn
+        self._set_span_arrays()
+        self._offsets_arr = self._lengths.cumsum() - self._lengths
+        self.offsets = self._offsets_arr.tolist()
+        self.length = int(self._lengths.sum())
+
+    def _set_span_arrays(self) -> None:
+        """sets the parallel span arrays and the attributes derived from them"""
+        self._starts, self._ends, self._lost, self._lengths = _spans_to_arrays(
+            self._spans
+        )
+        self._reverse = None
+        # discard values cached from the previous _start and _end
+        self.__dict__.pop("start", None)
+        self.__dict__.pop("end", None)
+        keep = ~self._lost
+        self.complete = not self._lost.any()
+        self.useful = bool(keep.any())
+        if self.useful:
+            self._start = int(self._starts[keep].min())
+            self._end = int(self._ends[keep].max())
+        else:
+            self._start = self._end = None
+
+    def _get_reverse(self) -> NDArray[bool]:
+        """returns the cached reverse flags of spans, False for lost spans"""
+        if self._reverse is None:
+            self._reverse = numpy.fromiter(
+                (not s.lost and s.reverse for s in self._spans),
+                dtype=bool,
+                count=len(self._spans),
+            )
+        return self._reverse
 
     @classmethod
     def from_spans(
@@ -1693,31 +2013,10 @@ class FeatureMap(MapABC):
         """>>> Map([(10,20), (15, 25), (80, 90)]).covered().spans
         [Span(10,25), Span(80, 90)]"""
 
-        delta = {}
-        for span in self.spans:
-            if span.lost:
-                continue
-            delta[span.start] = delta.get(span.start, 0) + 1
-            delta[span.end] = delta.get(span.end, 0) - 1
-        positions = sorted(delta.keys())
-        last_y = y = 0
-        last_x = start = None
-        result = []
-        for x in positions:
-            y += delta[x]
-            if x == last_x:
-                continue
-            if y and not last_y:
-                assert start is None
-                start = x
-            elif last_y and not y:
-                result.append((start, x))
-                start = None
-            last_x = x
-            last_y = y
-        assert y == 0
+        keep = ~self._lost
+        result = _covered_locations(self._starts[keep], self._ends[keep])
         return self.__class__.from_locations(
-            locations=result, parent_length=self.parent_length
+            locations=result.tolist(), parent_length=self.parent_length
         )
 
     def nucleic_reversed(self) -> "FeatureMap":
@@ -1727,42 +2026,36 @@ class FeatureMap(MapABC):
         -----
         discards reverse attribute on both spans and self
         """
-        spans = []
-        parent_length = self.parent_length
-        for s in self.spans:
-            if not s.lost:
-                start = parent_length - s.end
-                assert start >= 0
-                end = start + s.length
-                s = Span(start=start, end=end)
-            spans.append(s)
-
+        starts = self.parent_length - self._ends
+        assert (starts[~self._lost] >= 0).all()
+        ends = starts + self._lengths
+        spans = [
+            s if lost else Span(start=start, end=end)
+            for s, lost, start, end in zip(
+                self._spans, self._lost.tolist(), starts.tolist(), ends.tolist()
+            )
+        ]
         spans.reverse()
         return self.__class__(spans=spans, parent_length=self.parent_length)
 
     def get_gap_coordinates(self) -> SeqCoordTypes:
         """returns [(gap pos, gap length), ...]"""
-        gap_pos = []
-        spans = list(self.spans)
-        for i, span in enumerate(spans):
-            if not span.lost:
-                continue
-
-            pos = spans[i - 1].end if i else 0
-            gap_pos.append((pos, len(span)))
-
-        return gap_pos
+        (indices,) = numpy.where(self._lost)
+        # gap position is the end of the preceding span, 0 if first
+        pos = numpy.where(indices > 0, self._ends[indices - 1], 0)
+        return list(zip(pos.tolist(), self._lengths[indices].tolist()))
+
+    def _offset_locations(self, lost: bool) -> list[tuple[int, int]]:
+        """returns [(offset, offset + length), ...] of lost or non-lost spans"""
+        mask = self._lost if lost else ~self._lost
+        starts = self._offsets_arr[mask]
+        ends = starts + self._lengths[mask]
+        return list(zip(starts.tolist(), ends.tolist()))
 
     def gaps(self) -> "FeatureMap":
         """The gaps (lost spans) in this map"""
-        locations = []
-        offset = 0
-        for s in self.spans:
-            if s.lost:
-                locations.append((offset, offset + s.length))
-            offset += s.length
         return self.__class__.from_locations(
-            locations=locations, parent_length=len(self)
+            locations=self._offset_locations(True), parent_length=len(self)
         )
 
     def shadow(self) -> "FeatureMap":
@@ -1770,17 +2063,13 @@ class FeatureMap(MapABC):
         return self.inverse().gaps()
 
     def nongap(self) -> SeqSpanTypes:
-        locations = []
-        offset = 0
-        for s in self.spans:
-            if not s.lost:
-                locations.append((offset, offset + s.length))
-            offset += s.length
-        return _spans_from_locations(locations=locations, parent_length=len(self))
+        return _spans_from_locations(
+            locations=self._offset_locations(False), parent_length=len(self)
+        )
 
     def without_gaps(self) -> "FeatureMap":
         return self.__class__(
-            spans=[s for s in self.spans if not s.lost],
+            spans=list(compress(self._spans, ~self._lost)),
             parent_length=self.parent_length,
         )
 
@@ -1794,43 +2083,15 @@ class FeatureMap(MapABC):
         if self.parent_length is None:
             raise ValueError("Uninvertable. parent length not known")
 
-        cum_posn = 0
-        temp = []
-        for span in self.spans:
-            if not span.lost:
-                if span.reverse:
-                    temp.append(
-                        (span.start, span.end, cum_posn + span.length, cum_posn)
-                    )
-                else:
-                    temp.append(
-                        (span.start, span.end, cum_posn, cum_posn + span.length)
-                    )
-            cum_posn += span.length
-
-        temp.sort()
-        new_spans = []
-        last_start = 0
-        for start, end, cum_start, cum_end in temp:
-            if start > last_start:
-                new_spans.append(LostSpan(start - last_start))
-            elif start < last_start:
-                raise ValueError(f"Uninvertable. Overlap: {start} < {last_start}")
-
-            # we force tidy_<start/end> to be same as self, attribute has no meaning
-            # for IndelMap, but retained for compatability for now
-            new_spans.append(
-                Span(
-                    cum_start,
-                    cum_end,
-                    reverse=cum_start > cum_end,
-                )
-            )
-            last_start = end
-
-        if self.parent_length > last_start:
-            new_spans.append(LostSpan(self.parent_length - last_start))
-
+        new_spans = _inverted_spans(
+            self._starts,
+            self._ends,
+            self._lost,
+            self._lengths,
+            self._get_reverse(),
+            self.parent_length,
+            offsets=self._offsets_arr,
+        )
         return self.__class__(spans=new_spans, parent_length=len(self))
 
     def get_coordinates(self) -> SeqCoordTypes:
@@ -1839,31 +2100,60 @@ class FeatureMap(MapABC):
         v1/v2 are (start, end) unless the map is reversed, in which case it will
         be (end, start)"""
 
-        return [(s.start, s.end) for s in self.spans if not s.lost]
+        starts, ends = self.get_coordinates_array().T.tolist()
+        return list(zip(starts, ends))
+
+    def get_coordinates_array(self) -> IntArrayTypes:
+        """returns span coordinates as a numpy array of shape (n, 2)
+
+        Notes
+        -----
+        Rows are (start, end) of non-lost spans.
+        """
+        keep = ~self._lost
+        return numpy.column_stack([self._starts[keep], self._ends[keep]])
 
     def to_rich_dict(self) -> dict[str, Any]:
         """returns dicts for contained spans [dict(), ..]"""
-        spans = [s.to_rich_dict() for s in self.spans]
-        data = copy.deepcopy(self._serialisable)
-        data.pop("locations", None)
-        data["spans"] = spans
-        data["type"] = get_object_provenance(self)
+        # spans and parent_length are replaced, so a deepcopy is not required
+        data = {k: v for k, v in self._serialisable.items() if k != "locations"}
+        data["spans"] = [s.to_rich_dict() for s in self.spans]
+        data["type"] = _class_provenance(type(self))
         data["version"] = __version__
         data["parent_length"] = int(self.parent_length)
         return data
 
+    def to_compact_dict(self) -> dict[str, Any]:
+        """returns a dict with the spans packed into a single array
+
+        Notes
+        -----
+        More compact and faster to serialise than to_rich_dict(), but
+        spans cannot have a value. Inflated by from_rich_dict().
+        """
+        return {
+            "parent_length": int(self.parent_length),
+            "spans": _pack_spans(self._spans),
+            "type": _class_provenance(type(self)),
+            "version": __version__,
+        }
+
     def to_json(self) -> str:
         return json.dumps(self.to_rich_dict())
 
     @classmethod
     def from_rich_dict(cls, map_element) -> "FeatureMap":
-        from cogent3.util.deserialise import _get_class
-
         map_element.pop("version", None)
         type_ = map_element.pop("type")
         assert _get_class(type_) == cls
+        elements = map_element.pop("spans")
+        if isinstance(elements, dict):
+            # from to_compact_dict()
+            map_element["spans"] = _unpack_spans(elements)
+            return cls(**map_element)
+
         spans = []
-        for element in map_element.pop("spans"):
+        for element in elements:
             element.pop("version", None)
             klass = _get_class(element.pop("type"))
             instance = klass(**element)
@@ -1882,26 +2172,22 @@ class FeatureMap(MapABC):
         the original parent is being deliberately broken as in the
         Sequence.deepcopy(sliced=True) case.
         """
-        # todo there's probably a more efficient way to do this
-        # create the new instance
-        from cogent3.util.deserialise import deserialise_map_spans
-
-        data = self.to_rich_dict()
-        zeroed = deserialise_map_spans(data)
-        zeroed.parent_length = len(zeroed.get_covering_span())
-        shift = min(zeroed.start, zeroed.end)
-        new_end = 0
-        for span in zeroed.spans:
-            if span.lost:
-                continue
-            span.start -= shift
-            span.end -= shift
-            new_end = max(new_end, span.end)
-
-        zeroed._start = 0
-        zeroed._end = new_end
-
-        return zeroed
+        shift = self.start
+        # lost spans are not modified, so are shared with self
+        spans = [
+            span
+            if span.lost
+            else Span(
+                span.start - shift,
+                span.end - shift,
+                tidy_start=span.tidy_start,
+                tidy_end=span.tidy_end,
+                value=span.value,
+                reverse=span.reverse,
+            )
+            for span in self._spans
+        ]
+        return self.__class__(spans=spans, parent_length=self.end - shift)
 
     def absolute_position(self, rel_pos: IntTypes) -> IntTypes:
         """converts rel_pos into an absolute position
@@ -1910,12 +2196,11 @@ class FeatureMap(MapABC):
         ------
         raises ValueError if rel_pos < 0
         """
-        check = (
-            numpy.array([rel_pos], dtype=_DEFAULT_GAP_DTYPE)
-            if isinstance(rel_pos, int)
-            else rel_pos
-        )
-        if check.min() < 0:
+        if isinstance(rel_pos, (int, numpy.integer)):
+            negative = rel_pos < 0
+        else:
+            negative = rel_pos.min() < 0
+        if negative:
             raise ValueError(f"must positive, not {rel_pos=}")
 
         return rel_pos if len(self) == self.parent_length else self.start + rel_pos
@@ -1927,20 +2212,19 @@ class FeatureMap(MapABC):
         ------
         raises ValueError if abs_pos < 0
         """
-        check = (
-            numpy.array([abs_pos], dtype=_DEFAULT_GAP_DTYPE)
-            if isinstance(abs_pos, int)
-            else abs_pos
-        )
-        if check.min() < 0:
+        if isinstance(abs_pos, (int, numpy.integer)):
+            negative = abs_pos < 0
+        else:
+            negative = abs_pos.min() < 0
+        if negative:
             raise ValueError(f"must positive, not {abs_pos=}")
         return abs_pos - self.start
 
-    @property
+    @functools.cached_property
     def start(self):
         return self._start or 0
 
-    @property
+    @functools.cached_property
     def end(self):
         return self._end or 0
 
@@ -1965,11 +2249,22 @@ def gap_coords_to_map(
         gap_pos = numpy.array([], dtype=_DEFAULT_GAP_DTYPE)
         lengths = gap_pos.copy()
     else:
-        gap_pos, lengths = list(zip(*sorted(gaps_lengths.items())))
-        gap_pos = numpy.array(gap_pos, dtype=_DEFAULT_GAP_DTYPE)
-        lengths = numpy.array(lengths, dtype=_DEFAULT_GAP_DTYPE)
-
-    return IndelMap(gap_pos=gap_pos, gap_lengths=lengths, parent_length=seq_length)
+        num = len(gaps_lengths)
+        gap_pos = numpy.fromiter(gaps_lengths.keys(), dtype=numpy.int64, count=num)
+        lengths = numpy.fromiter(gaps_lengths.values(), dtype=numpy.int64, count=num)
+        if (numpy.diff(gap_pos) < 0).any():
+            # keys are unique, so the sort need not be stable
+            order = numpy.argsort(gap_pos)
+            gap_pos, lengths = gap_pos[order], lengths[order]
+        dtype = _gap_dtype_for(seq_length + int(lengths.sum()))
+        gap_pos = gap_pos.astype(dtype, copy=False)
+        lengths = lengths.astype(dtype, copy=False)
+
+    return IndelMap(
+        gap_pos=gap_pos,
+        cum_gap_lengths=numpy.add.accumulate(lengths, out=lengths),
+        parent_length=seq_length,
+    )
 
 
 @register_deserialiser(get_object_provenance(IndelMap))
@@ -1982,6 +2277,21 @@ def deserialise_featuremap(data: dict) -> FeatureMap:
     return FeatureMap.from_rich_dict(data)
 
 
+def _norm_slice_fast(index, length: int) -> tuple[int, int, Union[int, None]]:
+    """_norm_slice() without singledispatch overhead for slices and ints"""
+    index_type = type(index)
+    if index_type is slice:
+        start = _norm_index(index.start, length, 0)
+        end = _norm_index(index.stop, length, length)
+        return start, end, index.step
+    if index_type is int:
+        start = index + length if index < 0 else index
+        if start >= length:
+            raise IndexError(index)
+        return start, start + 1, 1
+    return _norm_slice(index, length)
+
+
 @functools.singledispatch
 def _norm_slice(index, length: int) -> tuple[int, int, Union[int, None]]:
     """_norm_slice(slice(1, -2, 3), 10) -> (1,8,3)"""
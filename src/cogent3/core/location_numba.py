@@ -0,0 +1,391 @@
+import numpy
+from numba import njit
+
+# turn off code coverage as njit-ted code not accessible to coverage
+
+
+@njit(cache=True)
+def gap_spans(gap_pos, cum_gap_lengths):  # pragma: no cover
+    """returns 1D arrays in alignment coordinates of gap start, gap stop"""
+    ends = gap_pos + cum_gap_lengths
+    starts = gap_pos.copy()
+    starts[1:] += cum_gap_lengths[:-1]
+    return starts, ends
+
+
+@njit(cache=True)
+def search_left(values, eytz_values, eytz_order, x):  # pragma: no cover
+    """equivalent to numpy.searchsorted(values, x, side='left')
+
+    Notes
+    -----
+    Uses eytzinger_search() if eytz_order is not empty.
+    """
+    if len(eytz_order):
+        return eytzinger_search(eytz_values, eytz_order, x)
+    return numpy.searchsorted(values, x, side="left")
+
+
+@njit(cache=True)
+def align_index(
+    gap_pos, cum_gap_lengths, eytz_values, eytz_order, seq_index, slice_stop
+):  # pragma: no cover
+    """converts a non-negative sequence index to an alignment index
+
+    Parameters
+    ----------
+    gap_pos, cum_gap_lengths
+        gap data of an IndelMap
+    eytz_values, eytz_order
+        eytzinger_layout() of gap_pos, or empty arrays
+    seq_index
+        the sequence index
+    slice_stop
+        if seq_index is in gap_pos, returns the alignment index of the start
+        of that gap
+    """
+    num_gaps = len(gap_pos)
+    if not num_gaps or seq_index < gap_pos[0]:
+        return seq_index
+
+    index = search_left(gap_pos, eytz_values, eytz_order, seq_index)
+    if slice_stop and index < num_gaps and gap_pos[index] == seq_index:
+        # alignment index of the first position of the gap
+        return seq_index + (cum_gap_lengths[index - 1] if index else 0)
+
+    if seq_index >= gap_pos[-1]:
+        return seq_index + cum_gap_lengths[-1]
+
+    if seq_index < gap_pos[index]:
+        return seq_index + (cum_gap_lengths[index - 1] if index else 0)
+    return seq_index + cum_gap_lengths[index]
+
+
+@njit(cache=True)
+def seq_index(
+    gap_pos, cum_gap_lengths, gap_starts, gap_ends, eytz_values, eytz_order, align_index
+):  # pragma: no cover
+    """converts a non-negative alignment index to a sequence index
+
+    Parameters
+    ----------
+    gap_pos, cum_gap_lengths
+        gap data of an IndelMap
+    gap_starts, gap_ends
+        alignment coordinates of the gaps, as returned by gap_spans()
+    eytz_values, eytz_order
+        eytzinger_layout() of gap_ends, or empty arrays
+    align_index
+        the alignment index
+    """
+    if not len(gap_pos) or align_index < gap_pos[0]:
+        return align_index
+
+    if align_index >= gap_ends[-1]:
+        return align_index - cum_gap_lengths[-1]
+
+    index = search_left(gap_ends, eytz_values, eytz_order, align_index)
+    if align_index < gap_starts[index]:
+        # before the gap at index
+        return align_index - cum_gap_lengths[index - 1]
+
+    if align_index == gap_ends[index]:
+        # after the gap at index
+        return align_index - cum_gap_lengths[index]
+
+    # within the gap at index, so the gap insertion position is the
+    # sequence position
+    return gap_pos[index]
+
+
+@njit(cache=True)
+def align_indices(
+    gap_pos, cum_gap_lengths, eytz_values, eytz_order, seq_indices, slice_stop
+):  # pragma: no cover
+    """applies align_index() to each element of seq_indices"""
+    result = numpy.empty(len(seq_indices), dtype=numpy.int64)
+    for i in range(len(seq_indices)):
+        result[i] = align_index(
+            gap_pos,
+            cum_gap_lengths,
+            eytz_values,
+            eytz_order,
+            seq_indices[i],
+            slice_stop,
+        )
+    return result
+
+
+@njit(cache=True)
+def seq_indices(
+    gap_pos,
+    cum_gap_lengths,
+    gap_starts,
+    gap_ends,
+    eytz_values,
+    eytz_order,
+    align_indices,
+):  # pragma: no cover
+    """applies seq_index() to each element of align_indices"""
+    result = numpy.empty(len(align_indices), dtype=numpy.int64)
+    for i in range(len(align_indices)):
+        result[i] = seq_index(
+            gap_pos,
+            cum_gap_lengths,
+            gap_starts,
+            gap_ends,
+            eytz_values,
+            eytz_order,
+            align_indices[i],
+        )
+    return result
+
+
+@njit(cache=True)
+def slice_indel_map(
+    gap_pos, cum_gap_lengths, gap_starts, gap_ends, start, stop
+):  # pragma: no cover
+    """returns gap_pos, cum_gap_lengths, parent_length of an IndelMap slice
+
+    Parameters
+    ----------
+    gap_pos, cum_gap_lengths
+        gap data of the map being sliced, must have at least one gap
+    gap_starts, gap_ends
+        alignment coordinates of the gaps, as returned by gap_spans()
+    start, stop
+        alignment coordinates, must satisfy 0 <= start < stop and the
+        slice must overlap with gap containing region
+    """
+    num_gaps = len(gap_pos)
+    # only the gaps begin:end are retained. The first of these is shortened
+    # by begin_diff if start is within it, the last by end_diff if stop is
+    # within it
+    begin_diff = 0
+    end_diff = 0
+    if start == 0:
+        # prefix slice, no adjustment of the beginning
+        l = 0
+        begin = 0
+        shift = 0
+    else:
+        # we find where the slice starts
+        l = numpy.searchsorted(gap_ends, start, side="left")
+        if gap_starts[l] <= start < gap_ends[l] and stop <= gap_ends[l]:
+            # entire span is within a single gap
+            new_pos = numpy.zeros(1, dtype=gap_pos.dtype)
+            new_cum = numpy.empty(1, dtype=cum_gap_lengths.dtype)
+            new_cum[0] = stop - start
+            return new_pos, new_cum, 0
+
+        if start < gap_pos[0]:
+            # start is before the first gap, we don't slice or shift
+            shift = start
+            begin = 0
+        elif gap_starts[l] <= start < gap_ends[l]:
+            # start is within a gap
+            # so the absolute gap_pos value remains unchanged, but we shorten
+            # the gap length
+            begin = l
+            begin_diff = start - gap_starts[l]
+            shift = gap_pos[l]
+        elif start == gap_ends[l]:
+            # at gap boundary, so beginning of non-gapped segment
+            # no adjustment to gap lengths
+            begin = l + 1
+            shift = start - cum_gap_lengths[l]
+        else:
+            # not within a gap
+            begin = l
+            shift = start - cum_gap_lengths[l - 1] if l else start
+
+    if stop >= gap_ends[-1]:
+        # suffix slice, all remaining gaps are included
+        end = num_gaps
+    else:
+        # start search for stop from l index
+        r = numpy.searchsorted(gap_ends[l:], stop, side="right") + l
+        if gap_starts[r] < stop <= gap_ends[r]:
+            # within gap
+            end = r + 1
+            end_diff = gap_ends[r] - stop
+        else:
+            end = r
+
+    new_pos = gap_pos[begin:end] - shift
+    prev_cum = cum_gap_lengths[begin - 1] if begin else 0
+    new_cum = cum_gap_lengths[begin:end] - prev_cum - begin_diff
+    if end_diff:
+        new_cum[-1] -= end_diff
+
+    no_values = gap_ends[:0]
+    no_order = numpy.empty(0, dtype=numpy.int64)
+    parent_length = seq_index(
+        gap_pos, cum_gap_lengths, gap_starts, gap_ends, no_values, no_order, stop
+    )
+    if start:
+        parent_length -= seq_index(
+            gap_pos, cum_gap_lengths, gap_starts, gap_ends, no_values, no_order, start
+        )
+    return (
+        new_pos.astype(gap_pos.dtype),
+        new_cum.astype(cum_gap_lengths.dtype),
+        parent_length,
+    )
+
+
+@njit(cache=True)
+def eytzinger_layout(sorted_values):  # pragma: no cover
+    """returns values, order of a sorted array in Eytzinger (BFS) layout
+
+    Notes
+    -----
+    Both arrays are 1-based with length len(sorted_values) + 1. order maps
+    each Eytzinger position back to its index in sorted_values, order[0]
+    is len(sorted_values) and is returned by eytzinger_search() when
+    all values are < x.
+    """
+    num = len(sorted_values)
+    values = numpy.zeros(num + 1, dtype=sorted_values.dtype)
+    order = numpy.empty(num + 1, dtype=numpy.int64)
+    order[0] = num
+    # iterative in-order traversal of the implicit tree
+    stack = numpy.empty(64, dtype=numpy.int64)
+    top = 0
+    i = 0
+    k = 1
+    while top or k <= num:
+        if k <= num:
+            stack[top] = k
+            top += 1
+            k = 2 * k
+            continue
+        top -= 1
+        k = stack[top]
+        values[k] = sorted_values[i]
+        order[k] = i
+        i += 1
+        k = 2 * k + 1
+    return values, order
+
+
+@njit(cache=True)
+def eytzinger_search(values, order, x):  # pragma: no cover
+    """equivalent to numpy.searchsorted(sorted_values, x, side='left')
+
+    Parameters
+    ----------
+    values, order
+        result of eytzinger_layout()
+    """
+    num = len(values) - 1
+    k = 1
+    while k <= num:
+        # branchless descent, right child when values[k] < x
+        k = 2 * k + (values[k] < x)
+    # strip the trailing right turns and the final left turn
+    while k & 1:
+        k >>= 1
+    k >>= 1
+    return order[k]
+
+
+@njit(cache=True)
+def update_lengths(
+    result_pos, result_lengths, gap_pos, gap_lengths
+):  # pragma: no cover
+    """adds gap_lengths to result_lengths where gap_pos occur in result_pos
+
+    Notes
+    -----
+    A linear merge, both position arrays must be sorted and result_pos
+    must be a superset of gap_pos. result_lengths is modified in place.
+    """
+    num = len(result_pos)
+    j = 0
+    for i in range(len(gap_pos)):
+        while j < num and result_pos[j] < gap_pos[i]:
+            j += 1
+        if j == num or result_pos[j] != gap_pos[i]:
+            raise ValueError("gap_pos not in result_pos")
+        result_lengths[j] += gap_lengths[i]
+
+
+@njit(cache=True)
+def merge_sorted_unique(a, b):  # pragma: no cover
+    """returns the sorted union of two sorted arrays of unique values
+
+    Notes
+    -----
+    A linear merge, equivalent to numpy.union1d for such inputs.
+    """
+    result = numpy.empty(len(a) + len(b), dtype=a.dtype)
+    i = j = k = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            result[k] = a[i]
+            i += 1
+        elif b[j] < a[i]:
+            result[k] = b[j]
+            j += 1
+        else:
+            result[k] = a[i]
+            i += 1
+            j += 1
+        k += 1
+    while i < len(a):
+        result[k] = a[i]
+        i += 1
+        k += 1
+    while j < len(b):
+        result[k] = b[j]
+        j += 1
+        k += 1
+    return result[:k].copy()
+
+
+@njit(cache=True)
+def invert_spans(lo, hi, cum_starts, cum_ends, parent_length):  # pragma: no cover
+    """returns starts, ends, lost, overlap of the spans of an inverted map
+
+    Parameters
+    ----------
+    lo, hi
+        parent coordinates of the non-lost spans, sorted
+    cum_starts, cum_ends
+        the corresponding coordinates of the spans in the map
+    parent_length
+        length of the parent
+
+    Notes
+    -----
+    Lost spans in the result have a start of 0 and their length as the end.
+    overlap is -1 if no spans overlap. Otherwise it is the index of the
+    first span that overlaps its predecessor, and the other results are
+    empty.
+    """
+    num = len(lo)
+    starts = numpy.empty(2 * num + 1, dtype=numpy.int64)
+    ends = numpy.empty(2 * num + 1, dtype=numpy.int64)
+    lost = numpy.zeros(2 * num + 1, dtype=numpy.bool_)
+    prev_hi = 0
+    k = 0
+    for i in range(num):
+        if lo[i] < prev_hi:
+            return starts[:0], ends[:0], lost[:0], i
+        if lo[i] > prev_hi:
+            starts[k] = 0
+            ends[k] = lo[i] - prev_hi
+            lost[k] = True
+            k += 1
+        starts[k] = cum_starts[i]
+        ends[k] = cum_ends[i]
+        k += 1
+        prev_hi = hi[i]
+
+    if parent_length > prev_hi:
+        starts[k] = 0
+        ends[k] = parent_length - prev_hi
+        lost[k] = True
+        k += 1
+    return starts[:k], ends[:k], lost[:k], -1
@@ -71,6 +71,9 @@ from cogent3.util.transform import for_seq, per_shortest
 ARRAY_TYPE = type(array(1))
 DEFAULT_ANNOTATION_DB = BasicAnnotationDb
 
+# characters of codons get_translation() can translate with the genetic code
+_canonical_codon_chars = frozenset("TCAG-")
+
 # standard distance functions: left  because generally useful
 frac_same = for_seq(f=eq, aggregator=sum, normalizer=per_shortest)
 frac_diff = for_seq(f=ne, aggregator=sum, normalizer=per_shortest)
@@ -1684,11 +1687,11 @@ class NucleicAcidSequence(Sequence):
             If True, raises an exception if length not divisible by 3
         """
         gc = get_code(gc)
-        _, s = self.parse_out_gaps()
+        s = str(self).replace(self.moltype.gap, "")
 
         divisible_by_3 = len(s) % 3 == 0
         if divisible_by_3:
-            end3 = str(s[-3:])
+            end3 = s[-3:]
             return gc.is_stop(end3)
 
         if strict:
@@ -1720,23 +1723,11 @@ class NucleicAcidSequence(Sequence):
             return self
 
         gc = get_code(gc)
-        m, s = self.parse_out_gaps()
-
-        divisible_by_3 = len(s) % 3 == 0
-        if not divisible_by_3:
-            return self
-
-        end = str(s[-3:])
-
-        if not gc.is_stop(end):
-            return self
-
-        if not m.num_gaps:
-            # has zero length if no gaps
+        s = str(self)
+        if self.moltype.gap not in s:
             return self[:-3]
 
         # determine terminal gap needed to fill in the sequence
-        s = str(self)
         gaps = "".join(self.moltype.gaps)
         pattern = f"({'|'.join(gc['*'])})[{gaps}]*$"
         terminal_stop = re.compile(pattern)
@@ -1782,16 +1773,27 @@ class NucleicAcidSequence(Sequence):
 
         protein = get_moltype("protein_with_stop" if include_stop else "protein")
         gc = get_code(gc)
-        codon_alphabet = gc.get_alphabet(include_stop=include_stop).with_gap_motif()
-        moltype = self.moltype
-        # translate the codons
-        translation = []
         if include_stop or not trim_stop:
             # we just deal with sequence as is
             seq = str(self)
         else:
             seq = str(self.trim_stop_codon(gc=gc, strict=not incomplete_ok))
 
+        # if all codons are canonical or gaps, and any stops are allowed, the
+        # genetic code translates them directly, mapping '---' to 'X'
+        coding = seq[: len(seq) - len(seq) % 3]
+        translation = gc.translate(coding)
+        if (
+            _canonical_codon_chars.issuperset(coding)
+            and coding.count("-") == 3 * translation.count("X")
+            and (include_stop or "*" not in translation)
+        ):
+            return protein.make_seq(seq=translation.replace("X", "-"), name=self.name)
+
+        codon_alphabet = gc.get_alphabet(include_stop=include_stop).with_gap_motif()
+        moltype = self.moltype
+        # translate the codons
+        translation = []
         for posn in range(0, len(seq) - 2, 3):
             orig_codon = str(seq[posn : posn + 3])
             try:
@@ -30,13 +30,15 @@ from __future__ import annotations
 import json
 import numbers
 import re
+from array import array as pyarray
+from collections import Counter
 from copy import deepcopy
 from functools import reduce
-from itertools import combinations
+from itertools import combinations, islice
 from operator import or_
 from random import choice, shuffle
 
-from numpy import argsort, ceil, log, zeros
+from numpy import arange, argsort, array, ceil, full, int64, log, minimum, zeros
 
 from cogent3._version import __version__
 from cogent3.maths.stats.test import correlation
@@ -59,6 +61,94 @@ class TreeError(Exception):
     pass
 
 
+# an _LcaTable is built for a tree once last_common_ancestor() and
+# separation() have walked this many edges per node of the tree since it last
+# changed, when the walking has cost about as much as building the table
+_LCA_TABLE_STEPS_PER_NODE = 32
+
+# names containing any of these characters are quoted by get_newick()
+_newick_escape = re.compile("""[]['"(),:;_]""")
+
+
+class _LcaTable:
+    """Euler tour of a tree with a sparse table of range depth minima
+
+    Notes
+    -----
+    Gives the last common ancestor of two nodes in constant time.
+    Building is O(n log n) for n nodes.
+    """
+
+    def __init__(self, root):
+        nodes = [root]
+        # Euler tour positions, first visit to each node and the node depths
+        first = {id(root): 0}
+        euler = [0]
+        depths = [0]
+        stack = [(0, iter(root.children))]
+        while stack:
+            child = next(stack[-1][1], None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    # returning to the parent
+                    euler.append(stack[-1][0])
+                    depths.append(len(stack) - 1)
+                continue
+            first[id(child)] = len(euler)
+            euler.append(len(nodes))
+            depths.append(len(stack))
+            stack.append((len(nodes), iter(child.children)))
+            nodes.append(child)
+
+        # keys combine depth and tour position, so the minimum key in a
+        # range identifies the shallowest node. sparse[k][i] is the minimum
+        # of keys[i:i + 2**k]
+        num = len(depths)
+        keys = array(depths, dtype=int64) * num + arange(num)
+        sparse = [keys]
+        width = 1
+        while 2 * width <= num:
+            prev = sparse[-1]
+            sparse.append(minimum(prev[:-width], prev[width:]))
+            width *= 2
+
+        self._nodes = nodes
+        self._first = first
+        self._euler = euler
+        self._depths = depths
+        self._num = num
+        # indexing an array.array gives Python ints, much faster than numpy
+        self._sparse = [pyarray("q", row.tobytes()) for row in sparse]
+
+    def _lca_position(self, node, other):
+        """tour position of the last common ancestor, None if either node is
+        not in the tree"""
+        left = self._first.get(id(node))
+        right = self._first.get(id(other))
+        if left is None or right is None:
+            return None
+        if left > right:
+            left, right = right, left
+        level = (right - left + 1).bit_length() - 1
+        row = self._sparse[level]
+        return min(row[left], row[right - (1 << level) + 1]) % self._num
+
+    def lca_steps(self, node, other):
+        """returns the last common ancestor with the number of edges to it
+        from node and other, None if either node is not in the tree"""
+        pos = self._lca_position(node, other)
+        if pos is None:
+            return None
+        depths, first = self._depths, self._first
+        depth = depths[pos]
+        return (
+            self._nodes[self._euler[pos]],
+            depths[first[id(node)]] - depth,
+            depths[first[id(other)]] - depth,
+        )
+
+
 def _copy_node(n):
     result = n.__class__()
     efc = n._exclude_from_copy
@@ -78,7 +168,23 @@ class TreeNode(object):
         name_loaded: ?
     """
 
-    _exclude_from_copy = dict.fromkeys(["_parent", "children"])
+    _exclude_from_copy = dict.fromkeys(
+        [
+            "_parent",
+            "children",
+            "_version",
+            "_root_cache",
+            "_lca_cache",
+        ]
+    )
+    # on roots, incremented by edits that change the root or depth of any
+    # node in the tree, see _structure_changed()
+    _version = 0
+    # (root, root._version, depth) of the last root() / _depth() call
+    _root_cache = None
+    # [root._version, edges walked, edges walked at the next check,
+    # _LcaTable or None], on roots only
+    _lca_cache = None
 
     def __init__(
         self,
@@ -142,11 +248,23 @@ class TreeNode(object):
             return True
         self_names = self.get_node_names()
         other_names = other.get_node_names()
-        self_names = [v for v in self_names if v is not None]
-        self_names.sort()
-        other_names = [v for v in other_names if v is not None]
-        other_names.sort()
-        return self_names == other_names
+        name_set = set(self_names)
+        if name_set.symmetric_difference(other_names) - {None}:
+            return False
+
+        # names are usually unique, so the sets are sufficient
+        name_set.discard(None)
+        num_self = len(self_names) - self_names.count(None)
+        num_other = len(other_names) - other_names.count(None)
+        if num_self == num_other == len(name_set):
+            return True
+
+        # otherwise duplicated names must occur equally often
+        self_counts = Counter(self_names)
+        other_counts = Counter(other_names)
+        self_counts.pop(None, None)
+        other_counts.pop(None, None)
+        return self_counts == other_counts
 
     def _to_self_child(self, i):
         """Converts i to self's type, with self as its parent.
@@ -155,6 +273,8 @@ class TreeNode(object):
         """
         c = self.__class__
         if isinstance(i, c):
+            if i._parent is not self:
+                i._structure_changed()
             if i._parent not in (None, self):
                 i._parent.children.remove(i)
         else:
@@ -176,6 +296,7 @@ class TreeNode(object):
 
     def pop(self, index=-1):
         """Returns and deletes child of self at index (default: -1)"""
+        self._structure_changed()
         result = self.children.pop(index)
         result._parent = None
         return result
@@ -201,6 +322,7 @@ class TreeNode(object):
     def __setitem__(self, i, val):
         """Node[i] = x sets the corresponding item in children."""
         curr = self.children[i]
+        self._structure_changed()
         if isinstance(i, slice):
             for c in curr:
                 c._parent = None
@@ -214,6 +336,7 @@ class TreeNode(object):
     def __delitem__(self, i):
         """del node[i] deletes index or slice from self.children."""
         curr = self.children[i]
+        self._structure_changed()
         if isinstance(i, slice):
             for c in curr:
                 c._parent = None
@@ -283,6 +406,7 @@ class TreeNode(object):
         """Mutator for parent: cleans up refs in old parent."""
         if self._parent is not None:
             self._parent.remove_node(self)
+        self._structure_changed()
         self._parent = parent
         if (parent is not None) and (self not in parent.children):
             parent.children.append(self)
@@ -432,8 +556,140 @@ class TreeNode(object):
                 child_index_stack.pop()
                 child_index_stack[-1] += 1
 
+    def __getstate__(self):
+        # cached results refer to the nodes of this tree, not the unpickled
+        # copy, and the _LcaTable is keyed by id()
+        state = self.__dict__.copy()
+        for key in ("_root_cache", "_lca_cache"):
+            state.pop(key, None)
+        return state
+
+    def _structure_changed(self):
+        """invalidates cached roots, depths and LCA tables of the tree self is
+        in, call before assigning to TreeNode._parent directly
+
+        Notes
+        -----
+        Call on a node before it is removed from its parent, or on a root
+        before it is given a parent. Adding nodes to a tree does not change
+        the root or depth of the nodes already in it, so the tree receiving
+        nodes is not invalidated.
+        """
+        self.root()._version += 1
+
+    def _root_depth(self):
+        """returns the root of self and the number of edges to it
+
+        Notes
+        -----
+        Cached until the version of the root changes. Only the root and depth
+        are stored, so memory is constant per node however deep the tree.
+        """
+        cache = self._root_cache
+        if cache is not None and cache[0]._version == cache[1]:
+            return cache[0], cache[2]
+
+        # walk up to the root, or to an ancestor with a valid cache, then
+        # set the cache of every node visited
+        path = [self]
+        curr = self._parent
+        while curr is not None:
+            cache = curr._root_cache
+            if cache is not None and cache[0]._version == cache[1]:
+                break
+            path.append(curr)
+            curr = curr._parent
+        else:
+            root = path.pop()
+            cache = root._root_cache = root, root._version, 0
+
+        root, version, depth = cache
+        for node in reversed(path):
+            depth += 1
+            node._root_cache = root, version, depth
+        return root, depth
+
+    def _depth(self):
+        """returns the number of edges between self and its root"""
+        return self._root_depth()[1]
+
+    def _lca_steps(self, other):
+        """returns the last common ancestor of self and other with the number
+        of edges to it from each, or None if they are not in the same tree"""
+        root, mine = self._root_depth()
+        table = root._get_lca_table()
+        if table is not None:
+            result = table.lca_steps(self, other)
+            if result is not None:
+                return result
+
+        node, relative = self, other
+        theirs = other._depth()
+        steps_mine = steps_theirs = 0
+        # align the depths, then walk both up until they meet
+        while mine > theirs:
+            node = node._parent
+            mine -= 1
+            steps_mine += 1
+        while theirs > mine:
+            relative = relative._parent
+            theirs -= 1
+            steps_theirs += 1
+        while node is not relative:
+            node = node._parent
+            relative = relative._parent
+            steps_mine += 1
+            steps_theirs += 1
+        if table is None:
+            root._lca_walked(steps_mine + steps_theirs)
+        elif node is not None:
+            # a node was added to the tree after the table was built
+            root._lca_cache = None
+        if node is None:
+            return None
+        return node, steps_mine, steps_theirs
+
+    def _get_lca_table(self):
+        """returns the _LcaTable for the tree rooted at self, None if one has
+        not been built since the tree last changed"""
+        cache = self._lca_cache
+        if cache is None or cache[0] != self._version:
+            return None
+        return cache[3]
+
+    def _lca_walked(self, steps):
+        """records the number of edges walked for a last common ancestor query
+        on the tree rooted at self
+
+        Notes
+        -----
+        Builds an _LcaTable once _LCA_TABLE_STEPS_PER_NODE edges per node have
+        been walked, so the table is only built for trees queried enough to
+        recover its cost.
+        """
+        cache = self._lca_cache
+        if cache is None or cache[0] != self._version:
+            cache = self._lca_cache = [self._version, 0, 0, None]
+        cache[1] += steps
+        if cache[1] < cache[2] or cache[3] is not None:
+            return
+
+        # count the nodes, stopping once there are too many for the table to
+        # have paid off, then check again after twice as many edges
+        per_node = _LCA_TABLE_STEPS_PER_NODE
+        limit = cache[1] // per_node + 1 if per_node else None
+        num_nodes = sum(1 for _ in islice(self.preorder(), limit))
+        if num_nodes * per_node <= cache[1]:
+            cache[3] = _LcaTable(self)
+        else:
+            cache[2] = 2 * cache[1]
+
     def ancestors(self):
-        """Returns all ancestors back to the root. Dynamically calculated."""
+        """Returns all ancestors back to the root. Dynamically calculated.
+
+        Not cached, storing the list on every node would take memory
+        quadratic in the depth of the tree.
+        """
         result = []
         curr = self._parent
         while curr is not None:
@@ -442,11 +698,31 @@ class TreeNode(object):
         return result
 
     def root(self):
-        """Returns root of the tree self is in. Dynamically calculated."""
-        curr = self
-        while curr._parent is not None:
-            curr = curr._parent
-        return curr
+        """Returns root of the tree self is in. Cached until the tree
+        changes."""
+        if self._parent is None:
+            return self
+        return self._root_depth()[0]
+
+    def precompute_paths(self):
+        """caches the root and depth of every node in the tree self is in
+
+        Notes
+        -----
+        Also builds the table used by last_common_ancestor() and
+        separation(), so each query on the tree is constant time. Use before
+        many such queries, e.g. all pairwise tip distances. The caches are
+        kept until the tree changes.
+        """
+        root = self.root()
+        version = root._version
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            node._root_cache = root, version, depth
+            depth += 1
+            stack.extend((child, depth) for child in node.children)
+        root._lca_cache = [version, 0, 0, _LcaTable(root)]
 
     def isroot(self):
         """Returns True if root of a tree, i.e. no parent."""
@@ -470,12 +746,34 @@ class TreeNode(object):
             if include_self:
                 yield self
             return None
-        # use stack-based method: robust to large trees
+        # use stack-based method: robust to large trees, children are pushed
+        # in reverse so tips are yielded in preorder
+        stack = [self]
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            curr = pop()
+            if children := curr.children:
+                extend(children[::-1])  # 20% faster than reversed
+            else:
+                yield curr
+
+    def iter_tips_unordered(self, include_self=False):
+        """Iterates over tips descended from self, [] if self is a tip.
+
+        Notes
+        -----
+        Faster than iter_tips() but the order of tips is arbitrary.
+        """
+        if not self.children:
+            if include_self:
+                yield self
+            return None
         stack = [self]
         while stack:
             curr = stack.pop()
             if curr.children:
-                stack.extend(curr.children[::-1])  # 20% faster than reversed
+                stack.extend(curr.children)
             else:
                 yield curr
 
@@ -541,13 +839,8 @@ class TreeNode(object):
 
         Always tests by identity.
         """
-        my_lineage = set([id(node) for node in [self] + self.ancestors()])
-        curr = other
-        while curr is not None:
-            if id(curr) in my_lineage:
-                return curr
-            curr = curr._parent
-        return None
+        steps = self._lca_steps(other)
+        return None if steps is None else steps[0]
 
     def lowest_common_ancestor(self, tipnames):
         """Lowest common ancestor for a list of tipnames
@@ -559,7 +852,7 @@ class TreeNode(object):
             return self.get_node_matching_name(tipnames[0])
 
         tipnames = set(tipnames)
-        tips = [tip for tip in self.tips() if tip.name in tipnames]
+        tips = [tip for tip in self.iter_tips_unordered() if tip.name in tipnames]
 
         if len(tips) != len(tipnames):
             missing = tipnames - set(self.get_tip_names())
@@ -599,21 +892,9 @@ class TreeNode(object):
         # detect trivial case
         if self is other:
             return 0
-        # otherwise, check the list of ancestors
-        my_ancestors = dict.fromkeys(list(map(id, [self] + self.ancestors())))
-        count = 0
-        while other is not None:
-            if id(other) in my_ancestors:
-                # need to figure out how many steps there were back from self
-                curr = self
-                while not (curr is None or curr is other):
-                    count += 1
-                    curr = curr._parent
-                return count
-            else:
-                count += 1
-                other = other._parent
-        return None
+        # sum the edges from each node to their last common ancestor
+        steps = self._lca_steps(other)
+        return None if steps is None else steps[1] + steps[2]
 
     def descendant_array(self, tip_list=None):
         """Returns numpy array with nodes in rows and descendants in columns.
@@ -641,7 +922,7 @@ class TreeNode(object):
         result = zeros([len(node_list), len(tip_list)])
         # put 1 in the column for each child of each node
         for i, node in enumerate(node_list):
-            children = [n.name for n in node.tips()]
+            children = {n.name for n in node.iter_tips_unordered()}
             for j, dec in enumerate(tip_list):
                 if dec in children:
                     result[i, j] = 1
@@ -693,7 +974,7 @@ class TreeNode(object):
         result = zeros((len(node_list), len(dec_list)))
         # put 1 in the column for each child of each node
         for i, node in enumerate(node_list):
-            children = [dec.name for dec in node.tips()]
+            children = {dec.name for dec in node.iter_tips_unordered()}
             for j, dec in enumerate(dec_list):
                 if dec in children:
                     result[i, j] = 1
@@ -797,63 +1078,56 @@ class TreeNode(object):
         with_node_names
             includes internal node names (except 'root')
         """
-        result = ["("]
-        nodes_stack = [[self, len(self.children)]]
-        node_count = 1
 
-        while nodes_stack:
-            node_count += 1
-            # check the top node, any children left unvisited?
-            top = nodes_stack[-1]
-            top_node, num_unvisited_children = top
-            if num_unvisited_children:  # has any child unvisited
-                top[1] -= 1  # decrease the # of children unvisited
-                # - for order
-                next_child = top_node.children[-num_unvisited_children]
-                # pre-visit
-                if next_child.children:
-                    result.append("(")
-                nodes_stack.append([next_child, len(next_child.children)])
-            else:  # no unvisited children
-                nodes_stack.pop()
-                # post-visit
-                if top_node.children:
-                    result[-1] = ")"
-
-                if top_node.name_loaded or with_node_names:
-                    if top_node.name is None or with_node_names and top_node.is_root():
-                        name = ""
-                    else:
-                        name = str(top_node.name)
-                        if escape_name and not (
-                            name.startswith("'") and name.endswith("'")
-                        ):
-                            if re.search("""[]['"(),:;_]""", name):
-                                name = "'%s'" % name.replace("'", "''")
-                            else:
-                                name = name.replace(" ", "_")
-                    result.append(name)
+        def label(node):
+            name = None
+            if node.name_loaded or with_node_names:
+                if node.name is None or with_node_names and node.is_root():
+                    name = ""
+                else:
+                    name = str(node.name)
+                    if escape_name and not (
+                        name.startswith("'") and name.endswith("'")
+                    ):
+                        if _newick_escape.search(name):
+                            name = "'%s'" % name.replace("'", "''")
+                        else:
+                            name = name.replace(" ", "_")
+
+            if with_distances and (length := getattr(node, "length", None)) is not None:
+                name = f"{name or ''}:{length}"
+            return name or ""
+
+        end = ";" if semicolon else ""
+        if not self.children:
+            if not (self.name_loaded or with_node_names):
+                return end
+            return f"{label(self)}{end}"
 
-                if (
-                    with_distances
-                    and (length := getattr(top_node, "length", None)) is not None
-                ):
-                    result[-1] = f"{result[-1]}:{length}"
+        # the stack holds nodes still to be written and the strings that
+        # follow them, so the result is only ever appended to
+        result = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                result.append(node)
+                continue
 
-                result.append(",")
+            children = node.children
+            if not children:
+                result.append(label(node))
+                continue
 
-        len_result = len(result)
-        if len_result == 2:  # single node no name
-            return ";" if semicolon else ""
+            result.append("(")
+            stack.append(f"){label(node)}")
+            stack.append(children[-1])
+            for child in children[-2::-1]:
+                stack.append(",")
+                stack.append(child)
 
-        if len_result == 3:  # single node with name
-            return f"{result[1]};" if semicolon else result[1]
-        else:
-            if semicolon:
-                result[-1] = ";"
-            else:
-                result.pop(-1)
-            return "".join(result)
+        result.append(end)
+        return "".join(result)
 
     def remove_node(self, target):
         """Removes node by identity instead of value.
@@ -1394,7 +1668,7 @@ class TreeNode(object):
 
     def subset(self):
         """Returns set of names that descend from specified node"""
-        return frozenset([i.name for i in self.tips()])
+        return frozenset([i.name for i in self.iter_tips_unordered()])
 
     def subsets(self):
         """Returns all sets of names that come from specified node and its kids"""
@@ -1453,9 +1727,11 @@ class TreeNode(object):
         def update_result():
             # set tip_tip distance between tips of different child
             for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    for tip2 in range(child2.__start, child2.__stop):
-                        result[tip1, tip2] = tipdistances[tip1] + tipdistances[tip2]
+                tips1 = slice(child1.__start, child1.__stop)
+                tips2 = slice(child2.__start, child2.__stop)
+                result[tips1, tips2] = (
+                    tipdistances[tips1][:, None] + tipdistances[tips2][None, :]
+                )
 
         for node in self.traverse(self_before=False, self_after=True):
             if not node.children:
@@ -2046,20 +2322,22 @@ class PhyloNode(TreeNode):
         result = zeros((num_tips, num_tips), float)  # tip by tip matrix
         # dist from tip to curr node
         tipdistances = zeros((num_all_tips), float)
+        # index in the result matrix of each tip, -1 if not in the result
+        result_index = full(num_all_tips, -1)
+        result_index[list(result_map)] = list(result_map.values())
 
         def update_result():
             # set tip_tip distance between tips of different child
             for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    if tip1 not in result_map:
-                        continue
-                    res_tip1 = result_map[tip1]
-                    for tip2 in range(child2.__start, child2.__stop):
-                        if tip2 not in result_map:
-                            continue
-                        result[res_tip1, result_map[tip2]] = (
-                            tipdistances[tip1] + tipdistances[tip2]
-                        )
+                index1 = result_index[child1.__start : child1.__stop]
+                index2 = result_index[child2.__start : child2.__stop]
+                keep1 = index1 >= 0
+                keep2 = index2 >= 0
+                dist1 = tipdistances[child1.__start : child1.__stop][keep1]
+                dist2 = tipdistances[child2.__start : child2.__stop][keep2]
+                result[index1[keep1][:, None], index2[keep2][None, :]] = (
+                    dist1[:, None] + dist2[None, :]
+                )
 
         for node in self.traverse(self_before=False, self_after=True):
             if not node.children:
@@ -1,6 +1,8 @@
 #!/usr/bin/env Python
 """Data for molecular weight calculations on proteins and nucleotides."""
 
+import numpy
+
 ProteinWeights = {
     "A": 71.09,
     "C": 103.16,
@@ -37,12 +39,14 @@ RnaWeightCorrection = DnaWeightCorrection
 class WeightCalculator(object):
     """Calculates molecular weight of a non-degenerate sequence."""
 
-    # refactor: array
-
     def __init__(self, Weights, Correction):
         """Returns a new WeightCalculator object (class, so serializable)."""
         self.Weights = Weights
         self.Correction = Correction
+        # weights indexed by character byte, 0 for characters not in Weights
+        self._weights = numpy.zeros(256, dtype=numpy.float64)
+        for char, weight in Weights.items():
+            self._weights[ord(char)] = weight
 
     def __call__(self, seq, correction=None):
         """Returns the molecular weight of a specified sequence."""
@@ -50,8 +54,12 @@ class WeightCalculator(object):
             return 0
         if correction is None:
             correction = self.Correction
-        get_mw = self.Weights.get
-        return sum([get_mw(i, 0) for i in seq]) + correction
+        # non-ascii characters are replaced one-for-one, so have weight 0
+        seq = str(seq).encode("ascii", "replace")
+        chars = numpy.frombuffer(seq, dtype=numpy.uint8)
+        # counting the characters avoids a per character weight lookup
+        counts = numpy.bincount(chars, minlength=256)
+        return float(counts @ self._weights) + correction
 
 
 DnaMW = WeightCalculator(DnaWeights, DnaWeightCorrection)
@@ -87,6 +87,7 @@ def _remap(map):
             if not span.lost:
                 span.start = span.start - start
                 span.end = span.end - start
+                span._update_key()
                 length = span.end
             spans.append(span)
         new_map = IndelMap(spans=spans, parent_length=length)
@@ -1,3 +1,4 @@
+from copy import deepcopy
 from unittest import TestCase
 
 import numpy
@@ -66,6 +67,16 @@ _codon_models = [
 ]
 
 
+# gaps of four aligned forms of the same sequence, and their union
+_gap_sets = (
+    {5: 1, 6: 3},
+    {2: 1, 5: 3},
+    {2: 1, 5: 1, 6: 2},
+    {0: 3},
+)
+_gap_sets_union = {0: 3, 2: 1, 5: 3, 6: 3}
+
+
 def make_pairwise(data, refseq_name, moltype="dna", array_align=False):
     """returns series of refseq, [(n, pwise aln),..]. All alignments are to ref_seq"""
     aln = make_aligned_seqs(
@@ -74,11 +85,22 @@ def make_pairwise(data, refseq_name, moltype="dna", array_align=False):
         moltype=moltype,
     )
     refseq = aln.get_seq(refseq_name)
-    pwise = [
-        (n, aln.take_seqs([refseq_name, n]).omit_gap_pos())
-        for n in aln.names
-        if n != refseq_name
-    ]
+    # drop the columns where both the reference and the query are gaps
+    chars = numpy.array([list(s) for s in aln.to_dict().values()])
+    gaps = numpy.isin(chars, list(aln.moltype.gaps))
+    ref_index = aln.names.index(refseq_name)
+    pwise = []
+    for index, n in enumerate(aln.names):
+        if n == refseq_name:
+            continue
+        keep = ~(gaps[ref_index] & gaps[index])
+        pair = {
+            refseq_name: "".join(chars[ref_index, keep]),
+            n: "".join(chars[index, keep]),
+        }
+        pwise.append(
+            (n, make_aligned_seqs(pair, array_align=array_align, moltype=moltype))
+        )
     return refseq, pwise
 
 
@@ -87,353 +109,299 @@ def make_aligned(gaps_lengths, seq, name="seq1"):
     return Aligned(gap_coords_to_map(gaps_lengths, len(seq)), seq)
 
 
-class RefalignmentTests(TestCase):
-    seqs = make_unaligned_seqs(_seqs, moltype=DNA)
+_gap_seq = DNA.make_seq(seq="AACCCGTT")
+_gap_aligned = tuple(make_aligned(gaps, _gap_seq) for gaps in _gap_sets)
 
-    def test_align_to_ref(self):
-        """correctly aligns to a reference"""
-        aligner = align_app.align_to_ref(ref_seq="Human")
-        aln = aligner(self.seqs)
-        expect = {
-            "Bandicoot": "---NACTCATTAATGCTTGAAACCAGCAGTTTATTGTCCAAC",
-            "FlyingFox": "GCCAGCTCTTTACAGCATGAGAACAG---TTTATTATACACT",
-            "Human": "GCCAGCTCATTACAGCATGAGAACAGCAGTTTATTACTCACT",
-            "Rhesus": "GCCAGCTCATTACAGCATGAGAAC---AGTTTGTTACTCACT",
-        }
-        self.assertEqual(aln.to_dict(), expect)
-
-    def test_align_to_ref_generic_moltype(self):
-        """tests when the moltype is generic"""
-        test_moltypes = ["text", "rna", "protein", "protein_with_stop", "bytes", "ab"]
-        for test_moltype in test_moltypes:
-            aligner = align_app.align_to_ref(moltype=test_moltype)
-            self.assertEqual(aligner._moltype.label, test_moltype)
-            self.assertEqual(
-                aligner._kwargs["S"],
-                make_generic_scoring_dict(10, get_moltype(test_moltype)),
-            )
+_treestring = "(Bandicoot:0.4,FlyingFox:0.05,(Rhesus:0.06,Human:0.0):0.04);"
 
-    def test_align_to_ref_result_has_moltype(self):
-        """aligned object has correct moltype"""
-        aligner = align_app.align_to_ref(moltype="dna")
-        got = aligner(self.seqs)
-        self.assertEqual(got.moltype.label, "dna")
-
-    def test_merged_gaps(self):
-        """correctly merges gaps"""
-        a = dict([(2, 3), (4, 9)])
-        b = dict([(2, 6), (8, 5)])
-        # omitting one just returns the other
-        self.assertIs(_merged_gaps(a, {}), a)
-        self.assertIs(_merged_gaps({}, b), b)
-        got = _merged_gaps(a, b)
-        self.assertEqual(got, [(2, 6), (4, 9), (8, 5)])
-
-    def test_aln_to_ref_known(self):
-        """correctly recapitulates known case"""
-        orig = make_aligned_seqs(
-            {
-                "Ref": "CAG---GAGAACAGAAACCCAT--TACTCACT",
-                "Qu1": "CAG---GAGAACAG---CCCGTGTTACTCACT",
-                "Qu2": "CAGCATGAGAACAGAAACCCGT--TA---ACT",
-                "Qu3": "CAGCATGAGAACAGAAACCCGT----CTCACT",
-                "Qu4": "CAGCATGAGAACAGAAACCCGTGTTACTCACT",
-                "Qu5": "CAG---GAGAACAG---CCCAT--TACTCACT",
-                "Qu6": "CAG---GA-AACAG---CCCAT--TACTCACT",
-                "Qu7": "CAG---GA--ACAGA--CCCGT--TA---ACT",
-            },
-            moltype="dna",
-        )
-        expect = orig.to_dict()
-        aligner = align_app.align_to_ref(ref_seq="Ref")
-        aln = aligner.main(orig.degap())
-        self.assertEqual(aln.to_dict(), expect)
-
-    def test_gap_union(self):
-        """correctly identifies the union of all gaps"""
-        # fails if not all sequences same
-        seq = DNA.make_seq(seq="AACCCGTT")
-        all_gaps = dict([(0, 3), (2, 1), (5, 3), (6, 3)])
-        make_aligned(all_gaps, seq)
-        gap_sets = [
-            dict([(5, 1), (6, 3)]),
-            dict([(2, 1), (5, 3)]),
-            dict([(2, 1), (5, 1), (6, 2)]),
-            dict([(0, 3)]),
-        ]
-        seqs = [make_aligned(gaps, seq) for gaps in gap_sets]
-        got = _gap_union(seqs)
-        self.assertEqual(got, dict(all_gaps))
-
-        # must all be Aligned instances
-        with self.assertRaises(TypeError):
-            _gap_union(seqs + ["GGGGGGGG"])
-
-        # must all have the same name
-        with self.assertRaises(ValueError):
-            _gap_union(seqs + [make_aligned({}, seq, name="blah")])
-
-    def test_gap_difference(self):
-        """correctly identifies the difference in gaps"""
-        seq = DNA.make_seq(seq="AACCCGTT")
-        dict([(0, 3), (2, 1), (5, 3), (6, 3)])
-        gap_sets = [
-            dict([(5, 1), (6, 3)]),
-            dict([(2, 1), (5, 3)]),
-            dict([(2, 1), (5, 1), (6, 2)]),
-            dict([(0, 3)]),
-        ]
-        seqs = [make_aligned(gaps, seq) for gaps in gap_sets]
-        union = _gap_union(seqs)
-        expects = [
-            [dict([(0, 3), (2, 1)]), dict([(5, 2)])],
-            [dict([(0, 3), (6, 3)]), {}],
-            [dict([(0, 3)]), dict([(5, 2), (6, 1)])],
-            [dict([(2, 1), (5, 3), (6, 3)]), {}],
-        ]
-        for seq, (plain, overlap) in zip(seqs, expects):
-            seq_gaps = dict(seq.map.get_gap_coordinates())
-            got_plain, got_overlap = _gap_difference(seq_gaps, union)
-            self.assertEqual(got_plain, dict(plain))
-            self.assertEqual(got_overlap, dict(overlap))
-
-    def test_merged_gaps(self):
-        """correctly handles gap values"""
-        a_gaps = {0: 2}
-        b_gaps = {2: 2}
-        self.assertEqual(_merged_gaps(a_gaps, {}), a_gaps)
-        self.assertEqual(_merged_gaps({}, b_gaps), b_gaps)
-
-    def test_combined_refseq_gaps(self):
-        union = dict([(0, 3), (2, 1), (5, 3), (6, 3)])
-        gap_sets = [
-            [(5, 1), (6, 3)],
-            [(2, 1), (5, 3)],
-            [(2, 1), (5, 1), (6, 2)],
-            [(0, 3)],
-        ]
-        # for subset gaps, their alignment position is the
-        # offset + their position + their gap length
-        expects = [
-            dict([(6, 2), (0, 3), (2, 1)]),
-            dict([(0, 3), (10, 3)]),
-            dict([(0, 3), (5 + 1 + 1, 2), (6 + 2 + 2, 1)]),
-            dict([(2 + 3, 1), (5 + 3, 3), (6 + 3, 3)]),
-        ]
-        for i, gap_set in enumerate(gap_sets):
-            got = _combined_refseq_gaps(dict(gap_set), union)
-            self.assertEqual(got, expects[i])
-
-        # if union gaps equals ref gaps
-        got = _combined_refseq_gaps({2: 2}, {2: 2})
-        self.assertEqual(got, {})
-
-    def test_gaps_for_injection(self):
-        # for gaps before any otherseq gaps, alignment coord is otherseq coord
-        oseq_gaps = {2: 1, 6: 2}
-        rseq_gaps = {0: 3}
-        expect = {0: 3, 2: 1, 6: 2}
-        seqlen = 50
-        got = _gaps_for_injection(oseq_gaps, rseq_gaps, seqlen)
-        self.assertEqual(got, expect)
-        # for gaps after otherseq gaps seq coord is align coord minus gap
-        # length totals
-        got = _gaps_for_injection(oseq_gaps, {4: 3}, seqlen)
-        expect = {2: 1, 3: 3, 6: 2}
-        self.assertEqual(got, expect)
-        got = _gaps_for_injection(oseq_gaps, {11: 3}, seqlen)
-        expect = {2: 1, 6: 2, 8: 3}
-        self.assertEqual(got, expect)
-        # gaps beyond sequence length added to end of sequence
-        got = _gaps_for_injection({2: 1, 6: 2}, {11: 3, 8: 3}, 7)
-        expect = {2: 1, 6: 2, 7: 6}
-        self.assertEqual(got, expect)
-
-    def test_pairwise_to_multiple(self):
-        """the standalone function constructs a multiple alignment"""
-        expect = {
+
+@pytest.fixture(scope="module")
+def seqs():
+    # shared by tests that do not modify it
+    return make_unaligned_seqs(_seqs, moltype=DNA)
+
+
+def test_align_to_ref(seqs):
+    """correctly aligns to a reference"""
+    aligner = align_app.align_to_ref(ref_seq="Human")
+    aln = aligner(seqs)
+    expect = {
+        "Bandicoot": "---NACTCATTAATGCTTGAAACCAGCAGTTTATTGTCCAAC",
+        "FlyingFox": "GCCAGCTCTTTACAGCATGAGAACAG---TTTATTATACACT",
+        "Human": "GCCAGCTCATTACAGCATGAGAACAGCAGTTTATTACTCACT",
+        "Rhesus": "GCCAGCTCATTACAGCATGAGAAC---AGTTTGTTACTCACT",
+    }
+    assert aln.to_dict() == expect
+
+
+def test_align_to_ref_result_has_moltype(seqs):
+    """aligned object has correct moltype"""
+    aligner = align_app.align_to_ref(moltype="dna")
+    got = aligner(seqs)
+    assert got.moltype.label == "dna"
+
+
+def test_merged_gaps_overlapping():
+    """correctly merges gaps"""
+    a = dict([(2, 3), (4, 9)])
+    b = dict([(2, 6), (8, 5)])
+    # omitting one just returns the other
+    assert _merged_gaps(a, {}) is a
+    assert _merged_gaps({}, b) is b
+    got = _merged_gaps(a, b)
+    assert got == {2: 6, 4: 9, 8: 5}
+
+
+def test_aln_to_ref_known():
+    """correctly recapitulates known case"""
+    orig = make_aligned_seqs(
+        {
             "Ref": "CAG---GAGAACAGAAACCCAT--TACTCACT",
             "Qu1": "CAG---GAGAACAG---CCCGTGTTACTCACT",
             "Qu2": "CAGCATGAGAACAGAAACCCGT--TA---ACT",
             "Qu3": "CAGCATGAGAACAGAAACCCGT----CTCACT",
-            "Qu7": "CAG---GA--ACAGA--CCCGT--TA---ACT",
             "Qu4": "CAGCATGAGAACAGAAACCCGTGTTACTCACT",
             "Qu5": "CAG---GAGAACAG---CCCAT--TACTCACT",
             "Qu6": "CAG---GA-AACAG---CCCAT--TACTCACT",
-        }
-        aln = make_aligned_seqs(expect, moltype="dna").omit_gap_pos()
-        expect = aln.to_dict()
-        for refseq_name in ["Qu3"]:
-            refseq, pwise = make_pairwise(expect, refseq_name)
-            got = pairwise_to_multiple(pwise, ref_seq=refseq, moltype=refseq.moltype)
-            self.assertEqual(len(got), len(aln))
-            orig = dict(pwise)
-            _, pwise = make_pairwise(got.to_dict(), refseq_name)
-            got = dict(pwise)
-            # should be able to recover the original pairwise alignments
-            for key, value in got.items():
-                self.assertEqual(value.to_dict(), orig[key].to_dict(), msg=refseq_name)
-
-            with self.assertRaises(TypeError):
-                pairwise_to_multiple(pwise, "ACGG", DNA)
-
-    def test_pairwise_to_multiple_2(self):
-        """correctly handle alignments with gaps beyond end of query"""
-
-        # cogent3.core.alignment.DataError: Not all sequences are the same length:
-        # max is 425, min is 419
-        def make_pwise(data, ref_name):
-            result = []
-            for n, seqs in data.items():
-                result.append(
-                    [n, make_aligned_seqs(data=seqs, moltype="dna", array_align=False)]
-                )
-            ref_seq = result[0][1].get_seq(ref_name)
-            return result, ref_seq
-
-        pwise = {
-            "Platypus": {
-                "Opossum": "-----------------GTGC------GAT-------------------------------CCAAAAACCTGTGTC--ACCGT--------GCC----CAGAGCCTCC----CTCAGGCCGCTCGGGGAG---TG-------GCCCCCCG--GC-GGAGGGCAGGGATGGGGAGT-AGGGGTGGCAGTC----GGAACTGGAAGAGCTT-TACAAACC---------GA--------------------GGCT-AGAGGGTC-TGCTTAC-------TTTTTACCTTGG------------GTTTG-CCAGGAGGTAG----------AGGATGA-----------------CTAC--ATCAAG----AGC------------TGGG-------------",
-                "Platypus": "CAGGATGACTACATCAAGAGCTGGGAAGATAACCAGCAAGGAGATGAAGCTCTGGACACTACCAAAGACCCCTGCCAGAACGTGAAGTGCAGCCGACACAAGGTCTGCATCGCTCAGGGCTACCAGAGAGCCATGTGTATCAGCCGCAAGAAGCTGGAGCACAGGATCAAGCAGCCAGCCCTGAAACTCCATGGAAACAGAGAGAGCTTCTGCAAGCCTTGTCACATGACCCAGCTGGCCTCTGTCTGCGGCTCGGACGGACACACTTACAGCTCCGTGTGCAAACTGGAGCAGCAGGCCTGTCTGACCAGCAAGCAGCTGACAGTCAAGTGTGAAGGCCAGTGCCCGTGCCCCACCGATCATGTTCCAGCCTCCACCGCTGATGGAAAACAAGAGACCT",
-            },
-            "Wombat": {
-                "Opossum": "GTGCGATCCAAAAACCTGTGTCACCGTGCCCAGAGCCTCCCTCAGGCCGCTCGG-GGAGTGGCCCCCCGGCGGAGGGCAGGGATGGGGAGTAGGGGTGGCAGTCGGAACTGGAAGAGCTTTACAAACCGAGGCTAGAGGGTCTGCTTACTTTTTACCTTGG------GTTT--GC-CAGGA---GGT----AGAGGATGACTACATCAAGAGCTGGG---------------------------",
-                "Wombat": "--------CA----------TCACCGC-CCCTGCACC---------CGGCTCGGCGGAGGGGGATTCTAA-GGGGGTCAAGGATGGCGAG-ACCCCTGGCAATTTCA--TGGAGGA------CGAGCAATGGCT-----GTC-GTCCATCTCCCAGTATAGCGGCAAGATCAAGCACTGGAACCGCTTCCGAGACGATGACTACATCAAGAGCTGGGAGGACAGTCAGCAAGGAGATGAAGCGC",
-            },
-        }
-        pwise, ref_seq = make_pwise(pwise, "Opossum")
-        aln = pairwise_to_multiple(pwise, ref_seq, ref_seq.moltype)
-        self.assertNotIsInstance(aln, NotCompleted)
-
-        pwise = {
-            "Platypus": {
-                "Opossum": "-----------------GTGC------GAT-------------------------------CCAAAAACCTGTGTC",
-                "Platypus": "CAGGATGACTACATCAAGAGCTGGGAAGATAACCAGCAAGGAGATGAAGCTCTGGACACTACCAAAGACCCCTGCC",
-            },
-            "Wombat": {
-                "Opossum": "GTGCGATCCAAAAACCTGTGTC",
-                "Wombat": "--------CA----------TC",
-            },
-        }
-        pwise, ref_seq = make_pwise(pwise, "Opossum")
-        aln = pairwise_to_multiple(pwise, ref_seq, ref_seq.moltype)
-        self.assertNotIsInstance(aln, NotCompleted)
-
-
-class ProgressiveAlignment(TestCase):
-    seqs = make_unaligned_seqs(_seqs, moltype=DNA)
-    treestring = "(Bandicoot:0.4,FlyingFox:0.05,(Rhesus:0.06," "Human:0.0):0.04);"
-
-    def test_progressive_align_protein_moltype(self):
-        """tests guide_tree is None and moltype is protein"""
-        from cogent3 import load_aligned_seqs
-
-        seqs = load_aligned_seqs("data/nexus_aa.nxs", moltype="protein")
-        seqs = seqs.degap()
-        seqs = seqs.take_seqs(["Rat", "Cow", "Human", "Mouse", "Whale"])
-        aligner = align_app.progressive_align(model="WG01")
-        got = aligner(seqs)
-        self.assertNotIsInstance(got, NotCompleted)
-        aligner = align_app.progressive_align(model="protein")
-        got = aligner(seqs)
-        self.assertNotIsInstance(got, NotCompleted)
-
-    def test_progressive_align_nuc(self):
-        """progressive alignment with nuc models"""
-        aligner = align_app.progressive_align(model="TN93", distance="TN93")
-        aln = aligner(self.seqs)
-        self.assertIsInstance(aln, ArrayAlignment)
-        self.assertEqual(len(aln), 42)
-        self.assertEqual(aln.moltype, aligner._moltype)
-        # todo the following is not robust across operating systems
-        # so commenting out for now, but needs to be checked
-        # expect = {'Human': 'GCCAGCTCATTACAGCATGAGAACAGCAGTTTATTACTCACT',
-        #           'Rhesus': 'GCCAGCTCATTACAGCATGAGAA---CAGTTTGTTACTCACT',
-        #           'Bandicoot': 'NACTCATTAATGCTTGAAACCAG---CAGTTTATTGTCCAAC',
-        #           'FlyingFox': 'GCCAGCTCTTTACAGCATGAGAA---CAGTTTATTATACACT'}
-        # got = aln.to_dict()
-        # self.assertEqual(got, expect)
-
-    def test_progressive_fails(self):
-        """should return NotCompletedResult along with message"""
-        # Bandicoot has an inf-frame stop codon
-        seqs = make_unaligned_seqs(
-            data={"Human": "GCCTCA", "Rhesus": "GCCAGCTCA", "Bandicoot": "TGATCATTA"},
-            moltype="dna",
-        )
-        aligner = align_app.progressive_align(model="codon")
-        got = aligner(seqs)
-        self.assertTrue(type(got), NotCompleted)
-
-    def test_progress_with_guide_tree(self):
-        """progressive align works with provided guide tree"""
-        tree = make_tree(treestring=self.treestring)
-        aligner = align_app.progressive_align(
-            model="nucleotide", guide_tree=self.treestring
-        )
-        aln = aligner(self.seqs)
-        self.assertEqual(len(aln), 42)
-        aligner = align_app.progressive_align(model="nucleotide", guide_tree=tree)
-        aln = aligner(self.seqs)
-        self.assertEqual(len(aln), 42)
-        # even if it has underscores in name
-        treestring = (
-            "(Bandicoot:0.4,FlyingFox:0.05,(Rhesus_macaque:0.06," "Human:0.0):0.04);"
-        )
-        aligner = align_app.progressive_align(model="nucleotide", guide_tree=treestring)
-        data = self.seqs.to_dict()
-        data["Rhesus macaque"] = data.pop("Rhesus")
-        seqs = make_unaligned_seqs(data)
-        aln = aligner(seqs)
-        self.assertEqual(len(aln), 42)
-        # guide tree with no lengths raises value error
-        with self.assertRaises(ValueError):
-            _ = align_app.progressive_align(
-                model="nucleotide",
-                guide_tree="(Bandicoot,FlyingFox,(Rhesus_macaque,Human));",
+            "Qu7": "CAG---GA--ACAGA--CCCGT--TA---ACT",
+        },
+        moltype="dna",
+    )
+    expect = orig.to_dict()
+    aligner = align_app.align_to_ref(ref_seq="Ref")
+    aln = aligner.main(orig.degap())
+    assert aln.to_dict() == expect
+
+
+def test_gap_union():
+    """correctly identifies the union of all gaps"""
+    # fails if not all sequences same
+    make_aligned(_gap_sets_union, _gap_seq)
+    seqs = list(_gap_aligned)
+    got = _gap_union(seqs)
+    assert got == _gap_sets_union
+
+    # must all be Aligned instances
+    with pytest.raises(TypeError):
+        _gap_union(seqs + ["GGGGGGGG"])
+
+    # must all have the same name
+    with pytest.raises(ValueError):
+        _gap_union(seqs + [make_aligned({}, _gap_seq, name="blah")])
+
+
+def test_gap_difference():
+    """correctly identifies the difference in gaps"""
+    union = _gap_union(_gap_aligned)
+    expects = [
+        [dict([(0, 3), (2, 1)]), dict([(5, 2)])],
+        [dict([(0, 3), (6, 3)]), {}],
+        [dict([(0, 3)]), dict([(5, 2), (6, 1)])],
+        [dict([(2, 1), (5, 3), (6, 3)]), {}],
+    ]
+    for seq, (plain, overlap) in zip(_gap_aligned, expects):
+        seq_gaps = dict(seq.map.get_gap_coordinates())
+        got_plain, got_overlap = _gap_difference(seq_gaps, union)
+        assert got_plain == dict(plain)
+        assert got_overlap == dict(overlap)
+
+
+def test_merged_gaps():
+    """correctly handles gap values"""
+    a_gaps = {0: 2}
+    b_gaps = {2: 2}
+    assert _merged_gaps(a_gaps, {}) == a_gaps
+    assert _merged_gaps({}, b_gaps) == b_gaps
+
+
+def test_combined_refseq_gaps():
+    # for subset gaps, their alignment position is the
+    # offset + their position + their gap length
+    expects = [
+        dict([(6, 2), (0, 3), (2, 1)]),
+        dict([(0, 3), (10, 3)]),
+        dict([(0, 3), (5 + 1 + 1, 2), (6 + 2 + 2, 1)]),
+        dict([(2 + 3, 1), (5 + 3, 3), (6 + 3, 3)]),
+    ]
+    for gap_set, expect in zip(_gap_sets, expects):
+        got = _combined_refseq_gaps(gap_set, _gap_sets_union)
+        assert got == expect
+
+    # if union gaps equals ref gaps
+    got = _combined_refseq_gaps({2: 2}, {2: 2})
+    assert got == {}
+
+
+def test_gaps_for_injection():
+    # for gaps before any otherseq gaps, alignment coord is otherseq coord
+    oseq_gaps = {2: 1, 6: 2}
+    rseq_gaps = {0: 3}
+    expect = {0: 3, 2: 1, 6: 2}
+    seqlen = 50
+    got = _gaps_for_injection(oseq_gaps, rseq_gaps, seqlen)
+    assert got == expect
+    # for gaps after otherseq gaps seq coord is align coord minus gap
+    # length totals
+    got = _gaps_for_injection(oseq_gaps, {4: 3}, seqlen)
+    expect = {2: 1, 3: 3, 6: 2}
+    assert got == expect
+    got = _gaps_for_injection(oseq_gaps, {11: 3}, seqlen)
+    expect = {2: 1, 6: 2, 8: 3}
+    assert got == expect
+    # gaps beyond sequence length added to end of sequence
+    got = _gaps_for_injection({2: 1, 6: 2}, {11: 3, 8: 3}, 7)
+    expect = {2: 1, 6: 2, 7: 6}
+    assert got == expect
+
+
+def test_pairwise_to_multiple():
+    """the standalone function constructs a multiple alignment"""
+    expect = {
+        "Ref": "CAG---GAGAACAGAAACCCAT--TACTCACT",
+        "Qu1": "CAG---GAGAACAG---CCCGTGTTACTCACT",
+        "Qu2": "CAGCATGAGAACAGAAACCCGT--TA---ACT",
+        "Qu3": "CAGCATGAGAACAGAAACCCGT----CTCACT",
+        "Qu7": "CAG---GA--ACAGA--CCCGT--TA---ACT",
+        "Qu4": "CAGCATGAGAACAGAAACCCGTGTTACTCACT",
+        "Qu5": "CAG---GAGAACAG---CCCAT--TACTCACT",
+        "Qu6": "CAG---GA-AACAG---CCCAT--TACTCACT",
+    }
+    aln = make_aligned_seqs(expect, moltype="dna").omit_gap_pos()
+    expect = aln.to_dict()
+    for refseq_name in ["Qu3"]:
+        refseq, pwise = make_pairwise(expect, refseq_name)
+        got = pairwise_to_multiple(pwise, ref_seq=refseq, moltype=refseq.moltype)
+        assert len(got) == len(aln)
+        orig = dict(pwise)
+        _, pwise = make_pairwise(got.to_dict(), refseq_name)
+        got = dict(pwise)
+        # should be able to recover the original pairwise alignments
+        for key, value in got.items():
+            assert value.to_dict() == orig[key].to_dict()
+
+        with pytest.raises(TypeError):
+            pairwise_to_multiple(pwise, "ACGG", DNA)
+
+
+def test_pairwise_to_multiple_2():
+    """correctly handle alignments with gaps beyond end of query"""
+
+    # cogent3.core.alignment.DataError: Not all sequences are the same length:
+    # max is 425, min is 419
+    def make_pwise(data, ref_name):
+        result = []
+        for n, seqs in data.items():
+            result.append(
+                [n, make_aligned_seqs(data=seqs, moltype="dna", array_align=False)]
             )
+        ref_seq = result[0][1].get_seq(ref_name)
+        return result, ref_seq
+
+    pwise = {
+        "Platypus": {
+            "Opossum": "-----------------GTGC------GAT-------------------------------CCAAAAACCTGTGTC--ACCGT--------GCC----CAGAGCCTCC----CTCAGGCCGCTCGGGGAG---TG-------GCCCCCCG--GC-GGAGGGCAGGGATGGGGAGT-AGGGGTGGCAGTC----GGAACTGGAAGAGCTT-TACAAACC---------GA--------------------GGCT-AGAGGGTC-TGCTTAC-------TTTTTACCTTGG------------GTTTG-CCAGGAGGTAG----------AGGATGA-----------------CTAC--ATCAAG----AGC------------TGGG-------------",
+            "Platypus": "CAGGATGACTACATCAAGAGCTGGGAAGATAACCAGCAAGGAGATGAAGCTCTGGACACTACCAAAGACCCCTGCCAGAACGTGAAGTGCAGCCGACACAAGGTCTGCATCGCTCAGGGCTACCAGAGAGCCATGTGTATCAGCCGCAAGAAGCTGGAGCACAGGATCAAGCAGCCAGCCCTGAAACTCCATGGAAACAGAGAGAGCTTCTGCAAGCCTTGTCACATGACCCAGCTGGCCTCTGTCTGCGGCTCGGACGGACACACTTACAGCTCCGTGTGCAAACTGGAGCAGCAGGCCTGTCTGACCAGCAAGCAGCTGACAGTCAAGTGTGAAGGCCAGTGCCCGTGCCCCACCGATCATGTTCCAGCCTCCACCGCTGATGGAAAACAAGAGACCT",
+        },
+        "Wombat": {
+            "Opossum": "GTGCGATCCAAAAACCTGTGTCACCGTGCCCAGAGCCTCCCTCAGGCCGCTCGG-GGAGTGGCCCCCCGGCGGAGGGCAGGGATGGGGAGTAGGGGTGGCAGTCGGAACTGGAAGAGCTTTACAAACCGAGGCTAGAGGGTCTGCTTACTTTTTACCTTGG------GTTT--GC-CAGGA---GGT----AGAGGATGACTACATCAAGAGCTGGG---------------------------",
+            "Wombat": "--------CA----------TCACCGC-CCCTGCACC---------CGGCTCGGCGGAGGGGGATTCTAA-GGGGGTCAAGGATGGCGAG-ACCCCTGGCAATTTCA--TGGAGGA------CGAGCAATGGCT-----GTC-GTCCATCTCCCAGTATAGCGGCAAGATCAAGCACTGGAACCGCTTCCGAGACGATGACTACATCAAGAGCTGGGAGGACAGTCAGCAAGGAGATGAAGCGC",
+        },
+    }
+    pwise, ref_seq = make_pwise(pwise, "Opossum")
+    aln = pairwise_to_multiple(pwise, ref_seq, ref_seq.moltype)
+    assert not isinstance(aln, NotCompleted)
+
+    pwise = {
+        "Platypus": {
+            "Opossum": "-----------------GTGC------GAT-------------------------------CCAAAAACCTGTGTC",
+            "Platypus": "CAGGATGACTACATCAAGAGCTGGGAAGATAACCAGCAAGGAGATGAAGCTCTGGACACTACCAAAGACCCCTGCC",
+        },
+        "Wombat": {
+            "Opossum": "GTGCGATCCAAAAACCTGTGTC",
+            "Wombat": "--------CA----------TC",
+        },
+    }
+    pwise, ref_seq = make_pwise(pwise, "Opossum")
+    aln = pairwise_to_multiple(pwise, ref_seq, ref_seq.moltype)
+    assert not isinstance(aln, NotCompleted)
+
+
+def test_progressive_align_protein_moltype():
+    """tests guide_tree is None and moltype is protein"""
+    from cogent3 import load_aligned_seqs
+
+    seqs = load_aligned_seqs("data/nexus_aa.nxs", moltype="protein")
+    seqs = seqs.degap()
+    seqs = seqs.take_seqs(["Rat", "Cow", "Human", "Mouse", "Whale"])
+    aligner = align_app.progressive_align(model="WG01")
+    got = aligner(seqs)
+    assert not isinstance(got, NotCompleted)
+    aligner = align_app.progressive_align(model="protein")
+    got = aligner(seqs)
+    assert not isinstance(got, NotCompleted)
+
 
-    def test_progressive_align_codon(self):
-        """progressive alignment with codon models"""
-        aligner = align_app.progressive_align(model="GY94")
-        aln = aligner(self.seqs)
-        self.assertEqual(len(aln), 42)
-        aligner = align_app.progressive_align(model="codon")
-        aln = aligner(self.seqs)
-        self.assertEqual(len(aln), 42)
-
-    def test_pickle_progressive_align(self):
-        """test progressive_align is picklable"""
-        from pickle import dumps, loads
-
-        aligner = align_app.progressive_align(model="codon")
-        aln = aligner(self.seqs)
-        got = loads(dumps(aln))
-        self.assertTrue(got)
-
-    def test_with_genetic_code(self):
-        """handles genetic code argument"""
-        aligner = align_app.progressive_align(model="GY94", gc="2")
-        # the 'TGA' codon is a sense codon in vertebrate mitochondrial
-        self.assertTrue("TGA" in aligner._model.get_motifs())
-        aligner = align_app.progressive_align(model="codon")
-        # but a stop codon in the standard nuclear
-        self.assertTrue("TGA" not in aligner._model.get_motifs())
-        # try using a nuclear
-        with self.assertRaises(TypeError):
-            aligner = align_app.progressive_align(model="nucleotide", gc="2")
-
-    def test_progressive_align_protein(self):
-        """progressive alignment with protein models"""
-        seqs = self.seqs.get_translation()
-        aligner = align_app.progressive_align(model="WG01", guide_tree=self.treestring)
-        aln = aligner(seqs)
-        self.assertEqual(len(aln), 14)
-        aligner = align_app.progressive_align(
-            model="protein", guide_tree=self.treestring
+def test_progressive_fails():
+    """should return NotCompletedResult along with message"""
+    # Bandicoot has an inf-frame stop codon
+    seqs = make_unaligned_seqs(
+        data={"Human": "GCCTCA", "Rhesus": "GCCAGCTCA", "Bandicoot": "TGATCATTA"},
+        moltype="dna",
+    )
+    aligner = align_app.progressive_align(model="codon")
+    got = aligner(seqs)
+    assert isinstance(got, NotCompleted)
+
+
+def test_progress_with_guide_tree(seqs):
+    """progressive align works with provided guide tree"""
+    tree = make_tree(treestring=_treestring)
+    aligner = align_app.progressive_align(model="nucleotide", guide_tree=_treestring)
+    aln = aligner(seqs)
+    assert len(aln) == 42
+    aligner = align_app.progressive_align(model="nucleotide", guide_tree=tree)
+    aln = aligner(seqs)
+    assert len(aln) == 42
+    # even if it has underscores in name
+    treestring = (
+        "(Bandicoot:0.4,FlyingFox:0.05,(Rhesus_macaque:0.06," "Human:0.0):0.04);"
+    )
+    aligner = align_app.progressive_align(model="nucleotide", guide_tree=treestring)
+    data = seqs.to_dict()
+    data["Rhesus macaque"] = data.pop("Rhesus")
+    seqs = make_unaligned_seqs(data)
+    aln = aligner(seqs)
+    assert len(aln) == 42
+    # guide tree with no lengths raises value error
+    with pytest.raises(ValueError):
+        _ = align_app.progressive_align(
+            model="nucleotide",
+            guide_tree="(Bandicoot,FlyingFox,(Rhesus_macaque,Human));",
         )
-        aln = aligner(seqs)
-        self.assertEqual(len(aln), 14)
+
+
+def test_with_genetic_code():
+    """handles genetic code argument"""
+    aligner = align_app.progressive_align(model="GY94", gc="2")
+    # the 'TGA' codon is a sense codon in vertebrate mitochondrial
+    assert "TGA" in aligner._model.get_motifs()
+    aligner = align_app.progressive_align(model="codon")
+    # but a stop codon in the standard nuclear
+    assert "TGA" not in aligner._model.get_motifs()
+    # try using a nuclear
+    with pytest.raises(TypeError):
+        aligner = align_app.progressive_align(model="nucleotide", gc="2")
+
+
+def test_progressive_align_protein(seqs):
+    """progressive alignment with protein models"""
+    seqs = seqs.get_translation()
+    aligner = align_app.progressive_align(model="WG01", guide_tree=_treestring)
+    aln = aligner(seqs)
+    assert len(aln) == 14
+    aligner = align_app.progressive_align(model="protein", guide_tree=_treestring)
+    aln = aligner(seqs)
+    assert len(aln) == 14
 
 
 class GapOffsetTests(TestCase):
@@ -524,17 +492,53 @@ def test_information_content_score(cls):
     assert_allclose(got, -2)
 
 
-@pytest.fixture(scope="function")
-def aln():
+@pytest.fixture(scope="module")
+def tn93_aln(seqs):
     aligner = align_app.progressive_align(model="TN93", distance="TN93")
-    seqs = make_unaligned_seqs(_seqs, moltype=DNA)
     return aligner(seqs)
 
 
 @pytest.fixture(scope="function")
-def seqs():
-    seqs = make_unaligned_seqs(_seqs, moltype=DNA)
-    return seqs
+def aln(tn93_aln):
+    # tests may modify the alignment info
+    return deepcopy(tn93_aln)
+
+
+@pytest.fixture(scope="module")
+def codon_aln(seqs):
+    aligner = align_app.progressive_align(model="codon")
+    return aligner(seqs)
+
+
+def test_progressive_align_nuc(tn93_aln):
+    """progressive alignment with nuc models"""
+    assert isinstance(tn93_aln, ArrayAlignment)
+    assert len(tn93_aln) == 42
+    assert tn93_aln.moltype == DNA
+    # todo the following is not robust across operating systems
+    # so commenting out for now, but needs to be checked
+    # expect = {'Human': 'GCCAGCTCATTACAGCATGAGAACAGCAGTTTATTACTCACT',
+    #           'Rhesus': 'GCCAGCTCATTACAGCATGAGAA---CAGTTTGTTACTCACT',
+    #           'Bandicoot': 'NACTCATTAATGCTTGAAACCAG---CAGTTTATTGTCCAAC',
+    #           'FlyingFox': 'GCCAGCTCTTTACAGCATGAGAA---CAGTTTATTATACACT'}
+    # got = aln.to_dict()
+    # assert got == expect
+
+
+def test_progressive_align_codon(seqs, codon_aln):
+    """progressive alignment with codon models"""
+    aligner = align_app.progressive_align(model="GY94")
+    aln = aligner(seqs)
+    assert len(aln) == 42
+    assert len(codon_aln) == 42
+
+
+def test_pickle_progressive_align(codon_aln):
+    """test progressive_align is picklable"""
+    from pickle import dumps, loads
+
+    got = loads(dumps(codon_aln))
+    assert got
 
 
 def test_cogent3_score(aln):
@@ -678,6 +682,16 @@ def test_smith_waterman_score(seqs):
     assert got == expect
 
 
+@pytest.mark.parametrize(
+    "moltype", ("text", "rna", "protein", "protein_with_stop", "bytes", "ab")
+)
+def test_align_to_ref_generic_moltype(moltype):
+    """tests when the moltype is generic"""
+    aligner = align_app.align_to_ref(moltype=moltype)
+    assert aligner._moltype.label == moltype
+    assert aligner._kwargs["S"] == make_generic_scoring_dict(10, get_moltype(moltype))
+
+
 @pytest.mark.parametrize(
     "moltype", ("text", "rna", "protein", "protein_with_stop", "bytes", "ab")
 )
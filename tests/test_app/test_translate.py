@@ -124,6 +124,9 @@ class TestFourFoldDegen(TestCase):
         for i in range(1, 3):
             got = get_fourfold_degenerate_sets(get_code(i), as_indices=False)
             self.assertEqual(got, expect)
+            # genetic code identifiers are accepted
+            got = get_fourfold_degenerate_sets(i, as_indices=False)
+            self.assertEqual(got, expect)
 
         with self.assertRaises(AssertionError):
             # as_indices requires an alphabet
@@ -199,3 +202,21 @@ def test_select_trabnslatable_exclude_internal_stop():
 def test_select_translatable_invalid_frame(frame):
     with pytest.raises(AssertionError):
         _ = select_translatable(frame=frame)
+
+
+@pytest.mark.parametrize("moltype", ("dna", "rna"))
+def test_best_frame_rc_moltype(moltype):
+    seq = make_unaligned_seqs(
+        {"s1_rc": "TATGACTTTATGAAGTAATAAACTGCTGTTCTCATGCTGTAATGAGCTGGCATTTATATT"},
+        moltype="dna",
+    ).to_moltype(moltype)
+    assert best_frame(seq.seqs[0], allow_rc=True) == -1
+
+
+@pytest.mark.parametrize(
+    "data", ("AT", "TAGTAGATAGATAGCTAGCTAG", "TAATAGCTAATGATTGACTAG")
+)
+def test_best_frame_untranslatable(data):
+    seq = DNA.make_seq(seq=data, name="s1")
+    with pytest.raises(ValueError):
+        best_frame(seq)
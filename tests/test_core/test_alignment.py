@@ -2842,6 +2842,16 @@ def test_get_translation_incomplete(cls):  # ported for SequenceCollection
         _ = alignment.get_translation(incomplete_ok=False)
 
 
+@pytest.mark.parametrize("cls", (Alignment, ArrayAlignment))
+def test_get_translation_mixed_codons(cls):
+    """translation of seqs with and without ambiguous codons"""
+    seqs = {"seq1": "ATG---TTTCCC", "seq2": "ATGCTNTTT---", "seq3": "ATGAAATTTGGG"}
+    alignment = cls(data=seqs, moltype=DNA)
+    got = alignment.get_translation()
+    assert got.to_dict() == {"seq1": "M-FP", "seq2": "MLF-", "seq3": "MKFG"}
+    assert got.moltype == PROTEIN
+
+
 @pytest.mark.parametrize("name", ("s1", "s2", "s3"))
 def test_get_seq_with_sliced_aln(name):
     seqs = {
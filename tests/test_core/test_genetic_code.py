@@ -3,8 +3,9 @@
 
 from unittest import TestCase
 
+import numpy
 import pytest
-from cogent3 import DNA, RNA
+from cogent3 import DNA, RNA, make_seq
 from cogent3.core.genetic_code import (
     DEFAULT,
     GeneticCode,
@@ -281,6 +282,10 @@ class GeneticCodeTests(TestCase):
 
         # check translation with invalid codon(s)
         self.assertEqual(sgc.translate("AAANNNCNC123UUU"), "KXXXF")
+        # lowercase, non-ascii and sequence objects
+        self.assertEqual(sgc.translate("auguuuaéa"), "MFX")
+        self.assertEqual(sgc.translate("auguuuaéa" * 20), "MFX" * 20)
+        self.assertEqual(sgc.translate(make_seq("ATGTTTTAA", moltype="dna")), "MF*")
 
     def test_sixframes(self):
         """GeneticCode sixframes should provide six-frame translation"""
@@ -417,3 +422,15 @@ def test_get_alphabet(code):
     alpha_wo_stop = gc.get_alphabet(include_stop=False)
     assert tuple(alpha_wo_stop) == tuple(gc.sense_codons)
     assert isinstance(alpha_wo_stop, Alphabet)
+
+
+@pytest.mark.parametrize("code", (1, 2, 11))
+def test_frame_stops(code):
+    gc = get_code(code)
+    seq = DNA.make_seq(seq="ATGTAACTAGTGATTTAGNNTAAC")
+    rc = seq.rc()
+    got = gc._frame_stops(seq, rc=True)
+    expect = [numpy.array([aa == "*" for aa in gc.translate(seq, i)]) for i in range(3)]
+    expect += [numpy.array([aa == "*" for aa in gc.translate(rc, i)]) for i in range(3)]
+    for frame, exp in zip(got, expect):
+        numpy.testing.assert_array_equal(frame, exp)
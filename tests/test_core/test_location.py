@@ -1,5 +1,6 @@
 """Unit tests for Span classes."""
 
+from bisect import bisect_right
 from itertools import combinations
 from unittest import TestCase
 
@@ -12,6 +13,11 @@ from cogent3.core.location import (
     LostSpan,
     Span,
     TerminalPadding,
+    _bisect_right_from_hint,
+    _covered_locations,
+    _norm_index,
+    _norm_slice,
+    _norm_slice_fast,
     gap_coords_to_map,
 )
 
@@ -86,6 +92,14 @@ class SpanTests(TestCase):
         self.reverse.reverses()
         self.assertFalse(self.reverse.reverse)
 
+    def test_reverses_sort_order(self):
+        """Span.reverses should be reflected in comparisons"""
+        fwd, rev = Span(30, 35), Span(30, 35)
+        self.assertEqual(fwd, rev)
+        rev.reverses()
+        self.assertNotEqual(fwd, rev)
+        self.assertLess(fwd, rev)
+
     def test_iter(self):
         """Span iter should loop through (integer) contents"""
         self.assertEqual(list(iter(self.empty)), [])
@@ -96,6 +110,13 @@ class SpanTests(TestCase):
         self.assertEqual(list(iter(self.inside)), [31])
         self.assertEqual(list(self.reverse), [34, 33, 32, 31, 30])
 
+    def test_as_array(self):
+        """Span.as_array should match iteration order"""
+        for span in (self.empty, self.full, self.spans_zero, self.reverse):
+            got = span.as_array()
+            self.assertEqual(got.dtype, numpy.int64)
+            self.assertEqual(got.tolist(), list(span))
+
     def test_str(self):
         """Span str should print start, stop, reverse"""
         self.assertEqual(str(self.empty), "(0,0,False)")
@@ -301,6 +322,23 @@ def test_map_plus_position():
     abs_coord = rcsubseq.absolute_position(0)
 
 
+@pytest.mark.parametrize("pos", (-1, numpy.int64(-1), numpy.array([2, -1])))
+@pytest.mark.parametrize("method", ("absolute_position", "relative_position"))
+def test_map_position_negative(pos, method):
+    fmap = FeatureMap.from_locations(locations=[(0, 9)], parent_length=9)
+    with pytest.raises(ValueError):
+        getattr(fmap, method)(pos)
+
+
+def test_map_position_types():
+    fmap = FeatureMap.from_locations(locations=[(2, 9)], parent_length=9)
+    assert fmap.absolute_position(numpy.int32(1)) == 3
+    assert fmap.relative_position(numpy.int64(3)) == 1
+    assert fmap.absolute_position(numpy.array([0, 1])).tolist() == [2, 3]
+    # scalars are not constrained to the range of the gap dtype
+    assert fmap.relative_position(2**40) == 2**40 - 2
+
+
 def test_indel_map_useful_complete():
     im = IndelMap.from_spans(spans=[LostSpan(3)], parent_length=0)
     assert not im.useful
@@ -507,6 +545,16 @@ def test_featuremap_inverse():
     assert got == expect
 
 
+def test_featuremap_inverse_reversed_spans():
+    spans = [Span(0, 2), LostSpan(2), Span(4, 6, reverse=True)]
+    m = FeatureMap(spans=spans, parent_length=6)
+    assert m._get_reverse().tolist() == [False, False, True]
+    first = m.inverse()
+    # the cached reverse flags give the same result
+    assert m.inverse().to_rich_dict() == first.to_rich_dict()
+    assert [s.reverse for s in first.spans if not s.lost] == [False, True]
+
+
 def test_indelmap_from_aligned_segments():
     locations = [(0, 2), (4, 6)]
     im = IndelMap.from_aligned_segments(locations=locations, aligned_length=6)
@@ -651,6 +699,19 @@ def test_indel_map_get_coords():
     locations = [(0, 9), (9, 20)]
     coords = imap.get_coordinates()
     assert coords == locations
+    got = imap.get_coordinates_array()
+    assert got.shape == (2, 2)
+    assert got.tolist() == [list(c) for c in locations]
+
+
+def test_featuremap_get_coordinates_array():
+    spans = [Span(2, 5), LostSpan(3), Span(7, 9)]
+    fmap = FeatureMap(spans=spans, parent_length=20)
+    got = fmap.get_coordinates_array()
+    assert got.tolist() == [[2, 5], [7, 9]]
+    empty = FeatureMap(spans=[LostSpan(3)], parent_length=20)
+    assert empty.get_coordinates_array().shape == (0, 2)
+    assert empty.get_coordinates() == []
 
 
 def test_indel_map_get_gap_coords():
@@ -662,7 +723,35 @@ def test_indel_map_get_gap_coords():
 
 
 @pytest.mark.parametrize(
-    "coords", ([(0, 3), (7, 11)], [(0, 3)], [(2, 4), (6, 10)], [(4, 6)])
+    "parent_length,dtype", ((10, numpy.int32), (2**31, numpy.int64))
+)
+def test_indelmap_gap_dtype(parent_length, dtype):
+    # int32 unless the alignment coordinates do not fit
+    gap_pos = numpy.array([2, 4], dtype=numpy.int64)
+    m = IndelMap(
+        gap_pos=gap_pos, gap_lengths=numpy.array([3, 1]), parent_length=parent_length
+    )
+    assert m.gap_pos.dtype == dtype
+    assert m.cum_gap_lengths.dtype == dtype
+    assert (m + m).gap_pos.tolist() == [2, 4, parent_length + 2, parent_length + 4]
+    assert (m * 3).gap_pos.tolist() == [6, 12]
+
+
+@pytest.mark.parametrize("lengths", ([], [3], [3, 1, 2]))
+def test_indelmap_get_gap_lengths(lengths):
+    lengths = numpy.array(lengths, dtype=int)
+    gap_pos = numpy.arange(len(lengths)) * 2
+    m = IndelMap(gap_pos=gap_pos, gap_lengths=lengths, parent_length=10)
+    got = m.get_gap_lengths()
+    assert got.tolist() == lengths.tolist()
+    # result is cached and read only
+    assert m.get_gap_lengths() is got
+    assert not got.flags.writeable
+
+
+@pytest.mark.parametrize(
+    "coords",
+    ([(0, 3), (7, 11)], [(0, 3)], [(2, 4), (6, 10)], [(4, 6)], [(0, 5), (5, 8)]),
 )
 def test_indelmap_joined_segments(coords):
     raw = "--AC--GGGG--"
@@ -877,6 +966,99 @@ def test_indelmap_get_align_index_negative(expect):
     assert got == expect
 
 
+@pytest.mark.parametrize("raw", ("--AC--GGGG--", "AC--GT-T", "ACGT", "---"))
+def test_indelmap_batch_indices(raw):
+    imap, _ = DNA.make_seq(seq=raw).parse_out_gaps()
+    align_indices = numpy.arange(-len(imap), len(imap) + 1)
+    expect = [imap.get_seq_index(i) for i in align_indices.tolist()]
+    assert imap.get_seq_indices(align_indices).tolist() == expect
+
+    seq_indices = numpy.arange(-imap.parent_length, imap.parent_length + 1)
+    for slice_stop in (False, True):
+        expect = [imap.get_align_index(i, slice_stop) for i in seq_indices.tolist()]
+        got = imap.get_align_indices(seq_indices, slice_stop=slice_stop)
+        assert got.tolist() == expect
+
+
+def test_indelmap_batch_indices_errors():
+    imap, _ = DNA.make_seq(seq="AC--GT").parse_out_gaps()
+    with pytest.raises(IndexError):
+        imap.get_seq_indices(numpy.array([0, -7]))
+    with pytest.raises(IndexError):
+        imap.get_align_indices(numpy.array([0, -5]))
+
+
+def test_update_lengths():
+    from cogent3.core.location import _update_lengths
+
+    result_pos = numpy.array([1, 3, 5])
+    result = numpy.zeros(3, dtype=int)
+    _update_lengths(result_pos, result, numpy.array([3, 5]), numpy.array([2, 1]))
+    assert result.tolist() == [0, 2, 1]
+    # gap_pos not a subset of result_pos
+    with pytest.raises(ValueError):
+        _update_lengths(result_pos, result, numpy.array([4]), numpy.array([1]))
+
+
+@pytest.mark.parametrize(
+    "a,b", (([], []), ([1, 4], []), ([], [2]), ([0, 3, 5], [1, 3, 9]), ([2], [2]))
+)
+def test_merge_sorted_unique(a, b):
+    from cogent3.core.location_numba import merge_sorted_unique
+
+    a = numpy.array(a, dtype=numpy.int32)
+    b = numpy.array(b, dtype=numpy.int32)
+    got = merge_sorted_unique(a, b)
+    assert got.tolist() == numpy.union1d(a, b).tolist()
+
+
+def test_invert_spans():
+    from cogent3.core.location_numba import invert_spans
+
+    lo = numpy.array([2, 5, 6])
+    hi = numpy.array([4, 6, 9])
+    cum_starts = numpy.array([0, 3, 3])
+    cum_ends = numpy.array([2, 2, 6])
+    starts, ends, lost, overlap = invert_spans(lo, hi, cum_starts, cum_ends, 10)
+    assert overlap == -1
+    assert starts.tolist() == [0, 0, 0, 3, 3, 0]
+    assert ends.tolist() == [2, 2, 1, 2, 6, 1]
+    assert lost.tolist() == [True, False, True, False, False, True]
+    # the span at index 1 overlaps its predecessor
+    lo[1] = 3
+    *_, overlap = invert_spans(lo, hi, cum_starts, cum_ends, 10)
+    assert overlap == 1
+
+
+@pytest.mark.parametrize("num", (0, 1, 2, 7, 8, 100))
+def test_eytzinger_search(num):
+    from cogent3.core.location_numba import eytzinger_layout, eytzinger_search
+
+    data = numpy.arange(num, dtype=numpy.int32) * 3
+    values, order = eytzinger_layout(data)
+    for x in range(-1, 3 * num + 2):
+        expect = numpy.searchsorted(data, x, side="left")
+        assert eytzinger_search(values, order, x) == expect
+
+
+def test_indelmap_many_gaps_indices(monkeypatch):
+    from cogent3.core import location
+
+    num = 50
+    gap_pos = numpy.arange(1, 2 * num, 2)
+    gap_lengths = numpy.arange(num) % 3 + 1
+    imap = IndelMap(gap_pos=gap_pos, gap_lengths=gap_lengths, parent_length=2 * num + 1)
+    expect_align = [imap.get_align_index(i) for i in range(imap.parent_length)]
+    expect_seq = [imap.get_seq_index(i) for i in range(len(imap))]
+    # lower the threshold so the eytzinger search is used
+    monkeypatch.setattr(location, "_EYTZINGER_THRESHOLD", 8)
+    got_align = [imap.get_align_index(i) for i in range(imap.parent_length)]
+    got_seq = [imap.get_seq_index(i) for i in range(len(imap))]
+    assert imap._eytzinger is not None
+    assert got_align == expect_align
+    assert got_seq == expect_seq
+
+
 @pytest.mark.parametrize(
     "data",
     (
@@ -1092,6 +1274,9 @@ def test_gap_coords_to_map():
     seqlen = 20
     got = gap_coords_to_map(gap_coords, seqlen)
     assert len(got) == sum(gap_coords.values()) + seqlen
+    # unordered keys are sorted
+    assert got.gap_pos.tolist() == [5, 10, 17]
+    assert got.get_gap_lengths().tolist() == [2, 2, 3]
 
     # roundtrip from Map.get_gap_coordinates()
     assert dict(got.get_gap_coordinates()) == gap_coords
@@ -1195,3 +1380,106 @@ def test_indelmap_make_seq_feature_map():
     got = im.make_seq_feature_map(align_map)
     assert got.get_coordinates() == expect.get_coordinates()
     assert got.parent_length == expect.parent_length
+
+
+@pytest.mark.parametrize(
+    "locations,expect",
+    (
+        ([(10, 20), (15, 25), (80, 90)], [[10, 25], [80, 90]]),
+        ([(1, 3), (3, 5), (7, 7), (8, 9)], [[1, 5], [8, 9]]),
+        ([(5, 9), (0, 10)], [[0, 10]]),
+        ([], []),
+    ),
+)
+def test_covered_locations(locations, expect):
+    starts = numpy.array([s for s, _ in locations], dtype=int)
+    ends = numpy.array([e for _, e in locations], dtype=int)
+    got = _covered_locations(starts, ends)
+    assert got.shape == (len(expect), 2)
+    assert got.tolist() == expect
+
+
+def test_featuremap_covered():
+    spans = [Span(10, 20), LostSpan(3), Span(15, 25), Span(80, 90, reverse=True)]
+    fmap = FeatureMap(spans=spans, parent_length=100)
+    got = fmap.covered()
+    assert got.get_coordinates() == [(10, 25), (80, 90)]
+    assert got.parent_length == 100
+
+
+@pytest.mark.parametrize("default", (0, 10))
+def test_norm_index_array(default):
+    values = [None, -12, -3, 0, 4, 10, 15]
+    expect = [_norm_index(v, 10, default) for v in values]
+    got = _norm_index(numpy.array(values, dtype=object), 10, default)
+    assert got.tolist() == expect
+    got = _norm_index(numpy.array(values[1:]), 10, default)
+    assert got.tolist() == expect[1:]
+
+
+@pytest.mark.parametrize("hint", (-1, 0, 3, 7, 11, 20))
+def test_bisect_right_from_hint(hint):
+    values = [0, 2, 2, 5, 9, 9, 9, 14, 20, 21, 30, 31]
+    for x in range(-1, 35):
+        assert _bisect_right_from_hint(values, x, hint) == bisect_right(values, x)
+
+
+def test_featuremap_compact_roundtrip_json():
+    import json
+
+    from cogent3.util.deserialise import deserialise_object
+
+    spans = [
+        TerminalPadding(2),
+        Span(2, 6, tidy_start=True),
+        LostSpan(3),
+        Span(8, 12, reverse=True, tidy_end=True),
+        LostSpan(1),
+    ]
+    fmap = FeatureMap(spans=spans, parent_length=20)
+    got = deserialise_object(json.dumps(fmap.to_compact_dict()))
+    assert isinstance(got, FeatureMap)
+    assert got.parent_length == fmap.parent_length
+    assert [s.to_rich_dict() for s in got.spans] == [
+        s.to_rich_dict() for s in fmap.spans
+    ]
+
+
+def test_featuremap_compact_dict_value():
+    fmap = FeatureMap(spans=[Span(2, 6, value="a")], parent_length=20)
+    with pytest.raises(ValueError):
+        fmap.to_compact_dict()
+
+
+def test_featuremap_to_rich_dict_independent():
+    fmap = FeatureMap.from_locations(locations=[(2, 6), (8, 12)], parent_length=20)
+    rd = fmap.to_rich_dict()
+    assert list(rd) == ["spans", "parent_length", "type", "version"]
+    rd["spans"].clear()
+    rd["parent_length"] = 0
+    assert len(fmap.to_rich_dict()["spans"]) == 2
+    assert fmap.to_rich_dict()["parent_length"] == 20
+
+
+@pytest.mark.parametrize(
+    "index",
+    (
+        slice(None),
+        slice(2, -3),
+        slice(-20, 20, 2),
+        0,
+        -1,
+        9,
+        numpy.int64(3),
+        Span(2, 5),
+        FeatureMap.from_locations(locations=[(1, 4)], parent_length=10),
+    ),
+)
+def test_norm_slice_fast(index):
+    assert _norm_slice_fast(index, 10) == _norm_slice(index, 10)
+
+
+@pytest.mark.parametrize("index", (10, numpy.int64(10)))
+def test_norm_slice_fast_invalid(index):
+    with pytest.raises(IndexError):
+        _norm_slice_fast(index, 10)
@@ -1278,6 +1278,17 @@ def test_get_translation_trim_stop():  # ported
     assert str(aa) == "I*L"
 
 
+@pytest.mark.parametrize(
+    "kwargs,expect",
+    (({}, "M-F-"), ({"include_stop": True}, "M-F*"), ({"incomplete_ok": True}, "M-F-")),
+)
+def test_get_translation_gapped_codons(kwargs, expect):
+    s = DNA.make_seq(seq="ATG---TTTTAA", name="s1")
+    aa = s.get_translation(**kwargs)
+    assert str(aa) == expect
+    assert aa.name == "s1"
+
+
 @pytest.mark.parametrize("start", (None, 0, 1, 10, -1, -10))
 @pytest.mark.parametrize("stop", (None, 10, 8, 1, 0, -1, -11))
 @pytest.mark.parametrize("step", (None, 1, 2, -1, -2))
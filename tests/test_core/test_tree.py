@@ -155,6 +155,10 @@ class TreeNodeTests(TestCase):
         self.assertEqual(self.BigParent.get_newick(), "(0,1,2,3,4,5,6,7,8,9)x;")
         self.BigParent[-1].extend("abc")
         self.assertEqual(self.BigParent.get_newick(), "(0,1,2,3,4,5,6,7,8,(a,b,c)9)x;")
+        # a lone unnamed child is still enclosed in parentheses
+        self.assertEqual(TreeNode(children=[TreeNode()]).get_newick(), "();")
+        node = TreeNode(name="x_y", children=[TreeNode(name="a b")])
+        self.assertEqual(node.get_newick(escape_name=True), "(a_b)'x_y';")
 
     def test_to_dict(self):
         """tree produces dict"""
@@ -319,6 +323,14 @@ class TreeNodeTests(TestCase):
         self.assertTrue(self.t.compare_by_names(self.t2))
         self.assertTrue(self.t.compare_by_names(self.t))
         self.assertFalse(self.t.compare_by_names(self.t4))
+        # unnamed nodes are ignored, duplicated names must match in number
+        t1 = DndParser("((a,b),c);")
+        self.assertTrue(t1.compare_by_names(DndParser("(a,(b,c));")))
+        self.assertFalse(
+            DndParser("((a,a),b);").compare_by_names(DndParser("((a,b),b);"))
+        )
+        # trees with different numbers of nodes can have the same names
+        self.assertTrue(DndParser("(a,b,c);").compare_by_names(t1))
 
     def test_eq(self):
         """TreeNode should compare equal if same id"""
@@ -803,6 +815,70 @@ class TreeNodeTests(TestCase):
         for i in list(nodes.values()):
             assert i.root() is root
 
+    def test_ancestors_root_after_edit(self):
+        """cached ancestors() and root() are updated when the tree changes"""
+        tree = DndParser("((a,b)c,(d,e)f)g;")
+        a = tree.get_node_matching_name("a")
+        c = tree.get_node_matching_name("c")
+        f = tree.get_node_matching_name("f")
+        self.assertEqual([n.name for n in a.ancestors()], ["c", "g"])
+        assert a.root() is tree
+        # the returned list is a copy
+        a.ancestors().clear()
+        self.assertEqual([n.name for n in a.ancestors()], ["c", "g"])
+        f.append(c)
+        self.assertEqual([n.name for n in a.ancestors()], ["c", "f", "g"])
+        tree.remove_node(f)
+        self.assertEqual([n.name for n in a.ancestors()], ["c", "f"])
+        assert a.root() is f
+        c.parent = None
+        self.assertEqual(a.ancestors(), [c])
+        assert a.root() is c
+        # root() of a tip is shared with its ancestors
+        assert c.root() is c
+        assert f.get_node_matching_name("d").root() is f
+        # caches are not copied
+        new = c.deepcopy()
+        self.assertEqual(new.get_node_matching_name("a").ancestors(), [new])
+
+    def test_root_depth_cache_per_tree(self):
+        """cached roots and depths are only invalidated by edits to their tree"""
+        tree = DndParser("((a,b)c,(d,e)f)g;")
+        other = DndParser("((x,y)z,w)v;")
+        a = tree.get_node_matching_name("a")
+        x = other.get_node_matching_name("x")
+        assert a.root() is tree
+        self.assertEqual(a._depth(), 2)
+        cached = a._root_cache
+        # building or editing another tree leaves the cache valid
+        DndParser("(p,q)r;")
+        other.append(TreeNode(name="u"))
+        other.get_node_matching_name("z").pop()
+        assert a.root() is tree
+        assert a._root_cache is cached
+        # moving a node invalidates the tree it leaves, the roots and depths
+        # of nodes in the receiving tree are unchanged
+        w = other.get_node_matching_name("w")
+        self.assertEqual(x._depth(), 2)
+        self.assertEqual(w._depth(), 1)
+        cached_w = w._root_cache
+        tree.get_node_matching_name("f").append(other.get_node_matching_name("z"))
+        assert x.root() is tree
+        self.assertEqual(x._depth(), 3)
+        self.assertEqual(w._depth(), 1)
+        assert w._root_cache is not cached_w
+        assert a.root() is tree
+        assert a._root_cache is cached
+        h = type(a)(name="h")
+        a.append(h)
+        assert a.root() is tree
+        assert a._root_cache is cached
+        self.assertEqual(h._depth(), 3)
+        # a root given a parent is invalidated
+        tree.append(other)
+        self.assertEqual(w._depth(), 2)
+        assert w.root() is tree
+
     def test_children(self):
         """TreeNode children should allow getting/setting children"""
         nodes = self.TreeNode
@@ -876,6 +952,16 @@ class TreeNodeTests(TestCase):
         tree = self.TreeRoot
         self.assertEqual([i.name for i in tree.iter_tips()], list("degh"))
 
+    def test_iter_tips_unordered(self):
+        """TreeNode iter_tips_unordered should give the same tips as iter_tips"""
+        tree = self.TreeRoot
+        self.assertEqual(
+            sorted(i.name for i in tree.iter_tips_unordered()), list("degh")
+        )
+        tip = self.TreeNode["g"]
+        self.assertEqual(list(tip.iter_tips_unordered()), [])
+        self.assertEqual(list(tip.iter_tips_unordered(include_self=True)), [tip])
+
     def test_nontips(self):
         """TreeNode nontips should return all non-terminal descendants"""
         tree = self.TreeRoot
@@ -911,6 +997,21 @@ class TreeNodeTests(TestCase):
         self.assertEqual(h.tip_children(), [])
         self.assertEqual(a.tip_children(), [h])
 
+    def test_tip_children_after_edit(self):
+        """tip_children and non_tip_children reflect changes to grandchildren"""
+        tree = DndParser("((a,b)c,d)e;")
+        c, d = tree.children
+        self.assertEqual(tree.tip_children(), [d])
+        self.assertEqual(tree.non_tip_children(), [c])
+        # a child's status depends on its own children, including direct
+        # changes to the children list
+        c.children = []
+        self.assertEqual(tree.tip_children(), [c, d])
+        self.assertEqual(tree.non_tip_children(), [])
+        d.append(TreeNode("x"))
+        self.assertEqual(tree.tip_children(), [c])
+        self.assertEqual(tree.non_tip_children(), [d])
+
     def test_non_tip_children(self):
         """TreeNode non_tip_children should return all non-terminal children"""
         self.assertEqual(self.Empty.non_tip_children(), [])
@@ -1089,6 +1190,8 @@ class TreeNodeTests(TestCase):
         self.assertEqual(f.separation(d), 2)
         self.assertEqual(f.separation(c), 1)
         self.assertEqual(c.separation(f), 1)
+        # nodes in different trees
+        self.assertIsNone(a.separation(TreeNode("x")))
 
     def test_name_unnamed_nodes(self):
         """name_unnamed_nodes assigns an arbitrary value when name == None"""
@@ -2331,3 +2434,183 @@ def test_load_tree_bad_encoding():
             f.write(newick.encode("ascii"))
 
         assert load_tree(tree_path).get_newick() == newick
+
+
+@pytest.mark.parametrize("threshold", (0, 10**9))
+def test_lca_separation_table(monkeypatch, threshold):
+    """last_common_ancestor and separation agree with and without the table"""
+    from cogent3.core import tree as tree_module
+
+    monkeypatch.setattr(tree_module, "_LCA_TABLE_STEPS_PER_NODE", threshold)
+    tree = DndParser("(((a,b)c,(d,e)f)g,(h,(i,j)k)l,m)n;")
+    nodes = {n.name: n for n in tree.preorder()}
+    for name1, name2 in [
+        ("a", "a"),
+        ("a", "b"),
+        ("a", "e"),
+        ("b", "i"),
+        ("c", "a"),
+        ("n", "j"),
+        ("m", "k"),
+    ]:
+        node1, node2 = nodes[name1], nodes[name2]
+        lineage = [node1] + node1.ancestors()
+        lca = next(n for n in lineage if n is node2 or node2 in n.preorder())
+        assert node1.last_common_ancestor(node2) is lca
+        assert node2.last_common_ancestor(node1) is lca
+        expect = lineage.index(lca) + ([node2] + node2.ancestors()).index(lca)
+        assert node1.separation(node2) == expect
+        assert node2.separation(node1) == expect
+
+    # different trees
+    other = DndParser("(x,y)z;")
+    assert nodes["a"].last_common_ancestor(other) is None
+    assert nodes["a"].separation(other) is None
+
+    # changes to the tree are respected
+    nodes["l"].append(nodes["c"])
+    assert nodes["a"].last_common_ancestor(nodes["i"]) is nodes["l"]
+    assert nodes["a"].separation(nodes["i"]) == 4
+    nodes["g"].remove_node(nodes["f"])
+    assert nodes["d"].last_common_ancestor(nodes["a"]) is None
+    assert nodes["d"].separation(nodes["f"]) == 1
+
+
+def test_lca_table_built_once(monkeypatch):
+    """the table is built once queries can recover its cost, and is kept
+    when other trees change"""
+    from cogent3.core import tree as tree_module
+
+    built = []
+
+    class CountingTable(tree_module._LcaTable):
+        def __init__(self, root):
+            built.append(root)
+            super().__init__(root)
+
+    monkeypatch.setattr(tree_module, "_LcaTable", CountingTable)
+    # a caterpillar tree with 200 tips
+    treestring = "(" * 198 + "(t0,t1)" + "".join(f",t{i})" for i in range(2, 200))
+    tree = make_tree(treestring=f"{treestring};")
+    tips = {tip.name: tip for tip in tree.tips()}
+    other = make_tree(treestring="((x,y)z,w)v;")
+    rng = random.Random(0)
+    for i in range(2000):
+        name1, name2 = rng.sample(sorted(tips), 2)
+        # t0 and t1 are the deepest tips, at the same depth
+        index1, index2 = sorted(max(int(n[1:]), 1) for n in (name1, name2))
+        assert tips[name1].separation(tips[name2]) == index2 - index1 + 2
+        # unrelated trees being built or edited
+        if i % 10 == 0:
+            make_tree(treestring="(a,b);")
+            other.append(other.pop(0))
+        if i == 20:
+            # isolated queries walk fewer edges than building costs
+            assert not built
+    assert built == [tree]
+
+    # queries on a large shallow tree never recover the cost of the table
+    star = make_tree(tip_names=[f"s{i}" for i in range(2000)])
+    star_tips = list(star.tips())
+    for i in range(1000):
+        assert star_tips[i].separation(star_tips[-i - 1]) == 2
+    assert built == [tree]
+
+    # adding nodes discards the table once it is found to be incomplete
+    new_tip = tips["t5"].parent.__class__(name="new")
+    tips["t5"].parent.append(new_tip)
+    assert new_tip.separation(tips["t5"]) == 2
+    assert tips["t5"].separation(new_tip) == 2
+    assert tree._get_lca_table() is None
+
+
+def test_precompute_paths():
+    """precompute_paths caches roots, depths and the LCA table"""
+    tree = DndParser("(((a,b)c,(d,e)f)g,(h,(i,j)k)l,m)n;")
+    nodes = {n.name: n for n in tree.preorder()}
+    nodes["k"].precompute_paths()
+    table = tree._get_lca_table()
+    assert table is not None
+    for node in nodes.values():
+        assert node._root_cache == (tree, tree._version, len(node.ancestors()))
+    assert nodes["a"].last_common_ancestor(nodes["e"]) is nodes["g"]
+    assert nodes["a"].separation(nodes["i"]) == 6
+    assert nodes["j"].separation(nodes["m"]) == 4
+    assert tree._get_lca_table() is table
+    # edits invalidate the caches
+    nodes["l"].append(nodes["c"])
+    assert tree._get_lca_table() is None
+    assert nodes["a"].separation(nodes["i"]) == 4
+    assert nodes["a"]._depth() == 3
+
+
+def test_lca_separation_deep_tree_memory(monkeypatch):
+    """cached state does not grow with the depth of a node"""
+    import tracemalloc
+
+    from cogent3.core import tree as tree_module
+
+    monkeypatch.setattr(tree_module, "_LCA_TABLE_STEPS_PER_NODE", 10**9)
+    # a caterpillar tree, each internal node has a tip and an internal child
+    depth = 2000
+    tree = TreeNode(name="root")
+    curr = tree
+    tips = []
+    for i in range(depth):
+        tip = TreeNode(name=f"t{i}")
+        inner = TreeNode(name=f"n{i}")
+        curr.extend([tip, inner])
+        tips.append(tip)
+        curr = inner
+    tips.append(curr)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for tip in tips[1:]:
+        # tips[0] is a child of the root
+        ancestors = tip.ancestors()
+        assert tip.separation(tips[0]) == len(ancestors) + 1
+        assert ancestors[-1] is tree
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # bounded per node, caching the full lineage of every node grows with
+    # the depth and retains over 16MB here
+    assert retained < 1000 * (2 * depth + 1)
+    assert tips[-1].last_common_ancestor(tips[-2]) is tips[-2].parent
+    assert tips[-1].separation(tips[-2]) == 2
+
+
+def test_lca_separation_pickled(monkeypatch):
+    """cached lineages and tables are not carried into unpickled trees"""
+    import pickle
+
+    from cogent3.core import tree as tree_module
+
+    monkeypatch.setattr(tree_module, "_LCA_TABLE_STEPS_PER_NODE", 0)
+    tree = DndParser("(((a,b)c,(d,e)f)g,(h,(i,j)k)l,m)n;")
+    nodes = {n.name: n for n in tree.preorder()}
+    # build the table and the cached lineages and roots
+    assert nodes["a"].last_common_ancestor(nodes["e"]) is nodes["g"]
+    assert nodes["a"].separation(nodes["i"]) == 6
+    assert nodes["a"].ancestors()[-1] is tree
+
+    copied = pickle.loads(pickle.dumps(tree))
+    nodes = {n.name: n for n in copied.preorder()}
+    assert nodes["a"].root() is copied
+    assert nodes["a"].ancestors()[-1] is copied
+    assert nodes["a"].last_common_ancestor(nodes["e"]) is nodes["g"]
+    assert nodes["a"].separation(nodes["i"]) == 6
+    assert nodes["b"].separation(nodes["m"]) == 4
+
+
+def test_tip_to_tip_distances_endpoints_order():
+    """distances for endpoints match the full matrix, in endpoints order"""
+    tree = make_tree("(((a:1,b:2)ab:3,c:4)abc:5,(d:6,(e:7,f:8)ef:9)def:10,g:11)")
+    full, tips = tree.tip_to_tip_distances()
+    names = [tip.name for tip in tips]
+    endpoints = ["f", "a", "g", "c"]
+    got, got_tips = tree.tip_to_tip_distances(endpoints=endpoints)
+    assert [tip.name for tip in got_tips] == endpoints
+    index = [names.index(name) for name in endpoints]
+    assert (got == full[index][:, index]).all()
+    assert got[0, 1] == 8 + 9 + 10 + 5 + 3 + 1